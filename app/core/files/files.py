@@ -1,4 +1,5 @@
 import os
+import shutil
 from pathlib import Path
 
 from fastapi import UploadFile
@@ -12,6 +13,18 @@ def save_file(directory_path: str, file_name: str, file_content: bytes) -> str:
     return file_path
 
 
+def save_upload(directory_path: str, file_name: str, file: UploadFile) -> str:
+    """
+    Сохраняет загруженный файл потоково, не читая его целиком в память.
+    """
+    Path(directory_path).mkdir(parents=True, exist_ok=True)
+    file_path = os.path.join(directory_path, file_name)
+    file.file.seek(0)
+    with open(file_path, 'wb') as destination:
+        shutil.copyfileobj(file.file, destination, 1024 * 1024)
+    return file_path
+
+
 def delete_file(file_path: str) -> bool:
     try:
         os.remove(file_path)
@@ -0,0 +1,104 @@
+import bisect
+import threading
+from typing import Callable
+
+# Границы корзин гистограмм по умолчанию, секунды
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _labels(label: str | None, label_value: str, extra: str = "") -> str:
+    pairs = [pair for pair in (f'{label}="{label_value}"' if label else "", extra) if pair]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Histogram:
+    """
+    Гистограмма с фиксированными корзинами и необязательной меткой (например, stage) в формате Prometheus.
+    """
+
+    def __init__(self, name: str, description: str, label: str | None = None,
+                 buckets: tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.description = description
+        self.label = label
+        self.buckets = buckets
+        self._series: dict[str, list] = {}  # значение метки -> [счетчики корзин, сумма, количество]
+        self._lock = threading.Lock()
+
+    def observe(self, *args) -> None:
+        """
+        observe(value) для гистограммы без метки, observe(label_value, value) - с меткой.
+        """
+        label_value, value = args if self.label else ("", args[0])
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_value)
+            if series is None:
+                series = self._series[label_value] = [[0] * len(self.buckets), 0.0, 0]
+            if index < len(self.buckets):
+                series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = {key: (list(counts), total, count) for key, (counts, total, count) in self._series.items()}
+        for label_value, (counts, total, count) in sorted(series.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                labels = _labels(self.label, label_value, 'le="%s"' % bound)
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _labels(self.label, label_value, 'le="+Inf"')
+            lines.append(f"{self.name}_bucket{labels} {count}")
+            lines.append(f"{self.name}_sum{_labels(self.label, label_value)} {total}")
+            lines.append(f"{self.name}_count{_labels(self.label, label_value)} {count}")
+        return lines
+
+
+class Counter:
+    def __init__(self, name: str, description: str):
+        self.name = name
+        self.description = description
+        self._value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: int = 1) -> None:
+        with self._lock:
+            self._value += amount
+
+    def render(self) -> list[str]:
+        return [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} counter", f"{self.name} {self._value}"]
+
+
+class Gauge:
+    """
+    Текущее значение, которое вычисляется функцией в момент выдачи метрик.
+    """
+
+    def __init__(self, name: str, description: str, func: Callable[[], float]):
+        self.name = name
+        self.description = description
+        self.func = func
+
+    def render(self) -> list[str]:
+        return [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} gauge", f"{self.name} {self.func()}"]
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: dict[str, Histogram | Counter | Gauge] = {}
+
+    def register(self, metric):
+        self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            lines += metric.render()
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
@@ -0,0 +1,80 @@
+import time
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+from typing import Iterator
+
+from app.config.config import init_config
+from app.core.metrics import Histogram, registry
+
+cfg = init_config()['timing']
+
+ENABLED: bool = cfg['enabled']
+
+stage_seconds = registry.register(Histogram(
+    "sdo_stage_duration_seconds", "Время этапов обработки запроса проверки", "stage"
+))
+
+# Длительности этапов текущего запроса: этап -> суммарное время в секундах.
+# Словарь создается в middleware и общий для всех задач и потоков, запущенных из запроса
+_timings: ContextVar[dict[str, float] | None] = ContextVar("timings", default=None)
+
+
+def start_request() -> dict[str, float] | None:
+    """
+    Начинает сбор длительностей этапов для текущего запроса.
+    """
+    if not ENABLED:
+        return None
+    timings: dict[str, float] = {}
+    _timings.set(timings)
+    return timings
+
+
+def current_timings() -> dict[str, float] | None:
+    return _timings.get()
+
+
+def use_timings(timings: dict[str, float] | None) -> None:
+    """
+    Привязывает длительности запроса к текущему контексту, например к фоновому обработчику очереди,
+    который выполняет проверку запроса.
+    """
+    if ENABLED:
+        _timings.set(timings)
+
+
+def record(name: str, seconds: float) -> None:
+    stage_seconds.observe(name, seconds)
+    timings = _timings.get()
+    if timings is not None:
+        timings[name] = timings.get(name, 0.0) + seconds
+
+
+@contextmanager
+def _timed(name: str) -> Iterator[None]:
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(name, time.perf_counter() - start)
+
+
+# Общий пустой контекст, чтобы при выключенном замере не создавать объекты на каждый этап
+_DISABLED = nullcontext()
+
+
+def stage(name: str):
+    """
+    Замер этапа: with stage("formulas"): ...
+    Время попадает в гистограмму и в длительности текущего запроса. При выключенном замере ничего не делает.
+    """
+    if not ENABLED:
+        return _DISABLED
+    return _timed(name)
+
+
+def server_timing(timings: dict[str, float]) -> str:
+    """
+    Значение заголовка Server-Timing, длительности в миллисекундах.
+    """
+    return ", ".join(f"{name};dur={seconds * 1000:.2f}" for name, seconds in timings.items())
@@ -0,0 +1,169 @@
+"""
+Асинхронные версии часто вызываемых методов БД для обработчиков запросов.
+
+Запросы выполняются через asyncpg и не занимают потоки пула, в котором FastAPI выполняет синхронный код.
+Ленивая загрузка связей в асинхронной сессии невозможна, поэтому связанные данные выбираются явными запросами.
+"""
+from typing import Union
+
+from sqlalchemy import select
+
+from app.db.code_methods import code_cache, code_hash, code_insert, decode_code
+from app.db.db import AsyncSession, GroupSubject, Solution, SolutionCode, Subject, Task, User
+from app.db.similarity_methods import index_solution
+from app.schemas.subject import SubjectInfo
+
+
+async def _group_subject_ids(session, group_id: int | None) -> list[int]:
+    rows = await session.execute(select(GroupSubject.subject_id).filter_by(group_id=group_id))
+    return list(rows.scalars())
+
+
+async def get_task_data(task_id: int) -> dict | None:
+    """
+    Получает данные задачи по её ID.
+
+    :param task_id: ID задачи
+    :return: Словарь с данными задачи, если найдена, иначе None
+    """
+    async with AsyncSession() as session:
+        task = await session.scalar(select(Task).filter_by(id=task_id))
+        if task:
+            return {
+                "id": task.id,
+                "name": task.name,
+                "description": task.description,
+                "teacher_formula": task.teacher_formula,
+                "input_variables": task.input_variables
+            }
+        return None
+
+
+async def get_latest_solution(user_id: int, task_id: int) -> Solution | None:
+    """
+    Получает последнее решение пользователя для конкретной задачи.
+    Код решения загружается в кэш кода, поэтому Solution.code не обращается к БД.
+
+    :param user_id: ID пользователя
+    :param task_id: ID задачи
+    :return: Последнее решение пользователя, если найдено, иначе None
+    """
+    async with AsyncSession() as session:
+        solution = await session.scalar(
+            select(Solution).filter_by(User_id=user_id, Task_id=task_id).order_by(Solution.id.desc()).limit(1)
+        )
+        if solution and code_cache.get(solution.code_hash) is None:
+            row = (await session.execute(
+                select(SolutionCode.data, SolutionCode.compression).filter_by(hash=solution.code_hash)
+            )).first()
+            if row:
+                code_cache.put(solution.code_hash, decode_code(row.data, row.compression))
+        return solution
+
+
+async def is_user_enrolled_in_subject(username: str, subject_id: int) -> bool | str:
+    """
+    Проверяет, зачислен ли пользователь на предмет по его ID.
+
+    :param username:
+    :param subject_id: ID предмета
+    :return: True, если пользователь зачислен на предмет, иначе False или строка с ошибкой
+    """
+    async with AsyncSession() as session:
+        try:
+            user = (await session.execute(select(User.id, User.studyGroup).filter_by(username=username))).first()
+            if not user:
+                return "User not found"
+
+            user_subject_list = await _group_subject_ids(session, user.studyGroup)
+
+            if not user_subject_list:
+                return "No subjects found"
+
+            return subject_id in user_subject_list
+
+        except Exception as e:
+            return f"Error checking enrollment for user {username} in subject {subject_id}: {e}"
+
+
+async def get_user_subjects(username: str) -> list[SubjectInfo]:
+    """
+    Получает все дисциплины, на которые зачислен пользователь (без фильтрации по статусу лабораторных).
+
+    :param username:
+    :return: Список дисциплин, на которые зачислен пользователь
+    """
+    async with AsyncSession() as session:
+        try:
+            subjects = await session.execute(
+                select(Subject.id, Subject.name)
+                .join(GroupSubject, GroupSubject.subject_id == Subject.id)
+                .join(User, User.studyGroup == GroupSubject.group_id)
+                .filter(User.username == username)
+            )
+            return [SubjectInfo(id=subject.id, name=subject.name, grade=0) for subject in subjects]
+
+        except Exception:
+            return []
+
+
+async def validate_user(username: str, password: str) -> Union[dict, bool]:
+    """
+    Validates the username and password of a user.
+
+    :param username: The username of the user.
+    :param password: The password of the user.
+    :return: True if the username and password match, False otherwise.
+    """
+    async with AsyncSession() as session:
+        user = await session.scalar(select(User).filter_by(username=username))
+        if user and user.password == password:
+            return {
+                "user_id": user.id,
+                "username": user.username,
+                "roleType": user.roleType,
+                "studyGroup": user.studyGroup
+            }
+        return False
+
+
+async def add_solution(code, user_id, task_id) -> str | bool:
+    """
+    Добавляет решение в базу данных.
+
+    :param code: Код решения (обязательное поле)
+    :param user_id: ID пользователя (обязательное поле)
+    :param task_id: ID задачи (обязательное поле)
+    :return: True или строка с ошибкой
+    """
+    if not code:
+        return "Code is a required field."
+
+    async with AsyncSession() as session:
+        subject_id = await session.scalar(select(Task.Subject_id).filter_by(id=task_id))
+        if not subject_id:
+            return "Task not found."
+
+        # Проверка, прикреплен ли пользователь к предмету
+        user = (await session.execute(select(User.id, User.studyGroup).filter_by(id=user_id))).first()
+        if not user:
+            return "User not found."
+
+        if subject_id not in await _group_subject_ids(session, user.studyGroup):
+            return "User is not enrolled in the subject."
+
+        try:
+            key = code_hash(code)
+            await session.execute(code_insert(key, code))
+            solution = Solution(code_hash=key, User_id=user_id, Task_id=task_id)
+            session.add(solution)
+            await session.flush()
+            # Сигнатура для поиска похожих решений сохраняется вместе с решением
+            index_solution(session, solution.id, task_id, code)
+            await session.commit()
+            code_cache.put(key, code)
+            return True
+        except Exception as e:
+            await session.rollback()
+            print(f"Error adding solution for user {user_id} and task {task_id}: {e}")
+            return "Error adding solution"
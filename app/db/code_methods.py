@@ -0,0 +1,111 @@
+import hashlib
+import threading
+import zlib
+from collections import OrderedDict
+
+from sqlalchemy.dialects.postgresql import insert
+
+from app.config.config import init_config
+from app.db.db import Session, SolutionCode
+
+cfg = init_config()['database']
+
+COMPRESSION_LEVEL = 6
+
+
+def code_hash(code: str) -> str:
+    return hashlib.sha256(code.encode('utf-8')).hexdigest()
+
+
+def decode_code(data: bytes, compression: str) -> str:
+    if compression == "zlib":
+        data = zlib.decompress(data)
+    return data.decode('utf-8')
+
+
+class CodeCache:
+    """
+    LRU-кэш исходного кода решений по хэшу содержимого. Код по хэшу не меняется, поэтому кэш не сбрасывается.
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._items: OrderedDict[str, str] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> str | None:
+        with self._lock:
+            code = self._items.get(key)
+            if code is not None:
+                self._items.move_to_end(key)
+            return code
+
+    def put(self, key: str, code: str) -> None:
+        with self._lock:
+            self._items[key] = code
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+
+
+code_cache = CodeCache(cfg['code_cache_size'])
+
+
+def code_insert(key: str, code: str):
+    """
+    Запрос добавления кода в SolutionCode. Одинаковый код, загруженный одновременно, не приводит к ошибке уникальности.
+    """
+    raw = code.encode('utf-8')
+    return insert(SolutionCode) \
+        .values(hash=key, data=zlib.compress(raw, COMPRESSION_LEVEL), compression="zlib", size=len(raw)) \
+        .on_conflict_do_nothing(index_elements=[SolutionCode.hash])
+
+
+def store_code(session: Session, code: str) -> str:
+    """
+    Сохраняет код в таблицу SolutionCode, если такого содержимого еще нет. Коммит выполняет вызывающий код.
+
+    :param session: Сессия, в которой добавляется решение
+    :param code: Исходный код
+    :return: Хэш кода для Solution.code_hash
+    """
+    key = code_hash(code)
+    session.execute(code_insert(key, code))
+    code_cache.put(key, code)
+    return key
+
+
+def read_codes(hashes) -> dict[str, str]:
+    """
+    Получает код по хэшам: из кэша, а отсутствующие в нем - одним запросом.
+
+    :param hashes: Хэши кода
+    :return: Словарь {хэш: код}
+    """
+    codes = {}
+    missing = []
+    for key in set(hashes):
+        code = code_cache.get(key)
+        if code is None:
+            missing.append(key)
+        else:
+            codes[key] = code
+
+    if missing:
+        with Session() as session:
+            rows = session.query(SolutionCode.hash, SolutionCode.data, SolutionCode.compression) \
+                .filter(SolutionCode.hash.in_(missing)) \
+                .all()
+        for key, data, compression in rows:
+            codes[key] = decode_code(data, compression)
+            code_cache.put(key, codes[key])
+    return codes
+
+
+def read_code(key: str) -> str | None:
+    """
+    Получает код по хэшу.
+
+    :return: Код или None, если хэш не найден
+    """
+    return read_codes([key]).get(key)
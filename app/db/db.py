@@ -1,12 +1,15 @@
 from typing import Union, Type, Any
 
-from sqlalchemy import create_engine, Column, Integer, String, ForeignKey, Table, Boolean, Float, func, case
+from sqlalchemy import create_engine, Column, Integer, String, ForeignKey, Table, Boolean, Float, func, case, DateTime, \
+    Index, text, BigInteger, LargeBinary
 from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship, sessionmaker, InstrumentedAttribute
 from sqlalchemy.dialects.postgresql import ENUM
 
 from app.config.config import init_config
+from app.db.pool import InstrumentedAsyncQueuePool, InstrumentedQueuePool, register_pool_metrics
 from app.schemas.auth import RegisterRequest
 from app.schemas.subject import SubjectInfo, LabStatus
 from app.schemas.teachers import TaskWithTestCasesSchema
@@ -21,10 +24,37 @@ for logger_name in ('sqlalchemy', 'sqlalchemy.engine', 'sqlalchemy.pool'):
 # Database connection setup
 cfg = init_config()['database']
 DATABASE_URL = f"postgresql://{cfg['user']}:{cfg['password']}@{cfg['host']}:{cfg['port']}/{cfg['name']}"
-engine = create_engine(DATABASE_URL, echo=False)
+engine = create_engine(
+    DATABASE_URL,
+    echo=False,
+    poolclass=InstrumentedQueuePool,
+    pool_size=cfg['pool_size'],
+    max_overflow=cfg['max_overflow'],
+    pool_timeout=cfg['pool_timeout'],
+    pool_pre_ping=cfg['pool_pre_ping'],
+    pool_recycle=cfg['pool_recycle'],
+)
+register_pool_metrics(engine)
 Base = declarative_base()
 Session = sessionmaker(bind=engine)
 
+# Асинхронный движок для часто вызываемых методов из обработчиков запросов (app.db.async_methods).
+# У него отдельный пул: процесс открывает до pool_size + max_overflow + async_pool_size + async_max_overflow соединений
+ASYNC_DATABASE_URL = f"postgresql+asyncpg://{cfg['user']}:{cfg['password']}@{cfg['host']}:{cfg['port']}/{cfg['name']}"
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL,
+    echo=False,
+    poolclass=InstrumentedAsyncQueuePool,
+    pool_size=cfg['async_pool_size'],
+    max_overflow=cfg['async_max_overflow'],
+    pool_timeout=cfg['pool_timeout'],
+    pool_pre_ping=cfg['pool_pre_ping'],
+    pool_recycle=cfg['pool_recycle'],
+)
+register_pool_metrics(async_engine.sync_engine, "sdo_db_async_pool")
+# Объекты остаются доступными после коммита: ленивая загрузка в асинхронной сессии невозможна
+AsyncSession = async_sessionmaker(bind=async_engine, expire_on_commit=False)
+
 RoleTypeEnum = ENUM('admin', 'teacher', 'student', name='role', create_type=True)
 
 
@@ -57,6 +87,10 @@ class Group(Base):
                             overlaps="subjects_link,groups_link")
     teacher_groups = relationship("TeacherHasGroups", back_populates="group")
 
+    __table_args__ = (
+        Index('ix_Group_faculty', 'faculty'),
+    )
+
 
 class User(Base):
     __tablename__ = 'User'
@@ -73,6 +107,10 @@ class User(Base):
     teacher_groups = relationship("TeacherHasGroups", back_populates="user")
     solutions = relationship('Solution', back_populates='user', cascade="all, delete-orphan")
 
+    __table_args__ = (
+        Index('ix_User_studyGroup', 'studyGroup'),
+    )
+
 
 class GroupSubject(Base):
     __tablename__ = 'Group_Subject'
@@ -92,10 +130,22 @@ class Subject(Base):
     groups_link = relationship("GroupSubject", back_populates="subject", overlaps="groups,subjects")
     tasks = relationship('Task', back_populates='subject')
 
+class SolutionCode(Base):
+    """
+    Исходный код решений, по одной строке на уникальное содержимое (ключ - SHA-256 кода).
+    Повторные отправки и одинаковые решения разных студентов ссылаются на одну строку.
+    """
+    __tablename__ = 'SolutionCode'
+    hash = Column(String(64), primary_key=True)
+    data = Column(LargeBinary, nullable=False)
+    compression = Column(String(8), nullable=False, default='zlib')  # zlib | none
+    size = Column(Integer, nullable=False)  # Размер кода без сжатия, байты
+
+
 class Solution(Base):
     __tablename__ = 'Solution'
     id = Column(Integer, primary_key=True)
-    code = Column(String, nullable=False)
+    code_hash = Column(String(64), ForeignKey('SolutionCode.hash'), nullable=False, index=True)
     mark = Column(Integer, nullable=True)
     is_hidden = Column(Boolean, nullable=False, default=False)
     lengthTestResult = Column(Boolean, nullable=True)
@@ -107,6 +157,21 @@ class Solution(Base):
     user = relationship('User', back_populates='solutions')
     task = relationship('Task', back_populates='solution', uselist=False)
 
+    __table_args__ = (
+        # Решения пользователя по задаче, последнее решение - первая запись индекса
+        Index('ix_Solution_user_task', User_id, Task_id, id.desc()),
+        # Проверка, сдана ли задача
+        Index('ix_Solution_success', 'User_id', 'Task_id', postgresql_where=text("status = 'Success'")),
+    )
+
+    @property
+    def code(self) -> str:
+        """
+        Исходный код решения. Читается из SolutionCode только при обращении и кэшируется по хэшу.
+        """
+        from app.db.code_methods import read_code
+        return read_code(self.code_hash)
+
 
 class Task(Base):
     __tablename__ = "Task"
@@ -116,20 +181,87 @@ class Task(Base):
     teacher_formula = Column(String, nullable=True)
     input_variables = Column(String, nullable=True)
     status = Column(String, nullable=False)
+    time_limit = Column(Integer, nullable=True)
+    memory_limit = Column(Integer, nullable=True)
+    output_limit = Column(Integer, nullable=True)
     Subject_id = Column(Integer, ForeignKey('Subject.id', ondelete='CASCADE'), nullable=False)
     subject = relationship('Subject', back_populates='tasks')
     solution = relationship('Solution', back_populates='task', uselist=False)
     testCases = relationship('TestCase', back_populates='task')
 
+    __table_args__ = (
+        Index('ix_Task_subject_status', 'Subject_id', 'status'),
+    )
+
 
 class TestCase(Base):
     __tablename__ = 'TestCase'
     id = Column(Integer, primary_key=True)
     inp = Column(String(512), nullable=False)
     out = Column(String(512), nullable=False)
+    # Тест с данными в файлах (пути относительно grading.test_data_dir), inp и out при этом пустые
+    inp_path = Column(String(512), nullable=True)
+    out_path = Column(String(512), nullable=True)
     Task_id = Column(Integer, ForeignKey('Task.id', ondelete='CASCADE'), nullable=True)
     task = relationship('Task', back_populates='testCases')
 
+    __table_args__ = (
+        Index('ix_TestCase_Task_id', 'Task_id'),
+    )
+
+
+class SolutionSignature(Base):
+    """
+    MinHash-сигнатура кода решения для поиска похожих решений (см. testing_pyfiles/similarity.py).
+    """
+    __tablename__ = 'SolutionSignature'
+    Solution_id = Column(Integer, ForeignKey('Solution.id', ondelete='CASCADE'), primary_key=True)
+    Task_id = Column(Integer, ForeignKey('Task.id', ondelete='CASCADE'), nullable=False)
+    signature = Column(LargeBinary, nullable=False)
+
+
+class SolutionBucket(Base):
+    """
+    LSH-корзины решения: по одной на каждую полосу сигнатуры.
+    Решения задачи с общей корзиной - кандидаты в похожие.
+    """
+    __tablename__ = 'SolutionBucket'
+    Solution_id = Column(Integer, ForeignKey('Solution.id', ondelete='CASCADE'), primary_key=True)
+    band = Column(Integer, primary_key=True)
+    bucket = Column(BigInteger, nullable=False)
+    Task_id = Column(Integer, ForeignKey('Task.id', ondelete='CASCADE'), nullable=False)
+
+    __table_args__ = (
+        Index('ix_SolutionBucket_bucket', 'Task_id', 'band', 'bucket'),
+    )
+
+
+class GradingJob(Base):
+    """
+    Задание на проверку решения в очереди PostgreSQL (grading.queue_backend = "postgres").
+    API добавляет задание, воркеры забирают его через SELECT ... FOR UPDATE SKIP LOCKED.
+    """
+    __tablename__ = 'GradingJob'
+    id = Column(String(32), primary_key=True)
+    status = Column(String(16), nullable=False, default='queued')  # queued -> running -> done | error
+    result = Column(String, nullable=True)  # ResponseTest в JSON
+    error = Column(String, nullable=True)
+    attempts = Column(Integer, nullable=False, default=0)
+    worker = Column(String(128), nullable=True)
+    created_at = Column(DateTime, nullable=False, server_default=func.now())
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+    User_id = Column(Integer, ForeignKey('User.id', ondelete='CASCADE'), nullable=False)
+    Task_id = Column(Integer, ForeignKey('Task.id', ondelete='CASCADE'), nullable=False)
+    Solution_id = Column(Integer, ForeignKey('Solution.id', ondelete='CASCADE'), nullable=False)
+
+    __table_args__ = (
+        Index('ix_GradingJob_queued', 'created_at', postgresql_where=text("status = 'queued'")),
+        Index('ix_GradingJob_active_solution', 'Solution_id',
+              postgresql_where=text("status IN ('queued', 'running')")),
+    )
+
+
 def delete_tables():
     Base.metadata.drop_all(engine)
 
@@ -0,0 +1,218 @@
+from datetime import timedelta
+
+from sqlalchemy import func, select
+
+from app.db.code_methods import read_code
+from app.db.db import Session, GradingJob, Solution
+
+# Первый ключ рекомендательной блокировки pg_advisory_xact_lock(namespace, solution_id) для заданий проверки
+GRADING_LOCK_NAMESPACE = 1001
+
+
+def add_grading_job(job_id: str, user_id: int, task_id: int, solution_id: int, lock: bool = True) -> str:
+    """
+    Ставит решение в очередь проверки. Если решение уже ждет проверки или проверяется,
+    новое задание не создается и возвращается ID существующего.
+
+    :param job_id: ID нового задания
+    :param user_id: ID пользователя
+    :param task_id: ID задачи
+    :param solution_id: ID проверяемого решения
+    :param lock: Проверка и добавление под рекомендательной блокировкой по решению,
+        чтобы одновременные запросы из разных процессов API не создали два задания
+    :return: ID задания, результат которого нужно ждать
+    """
+    with Session() as session:
+        try:
+            if lock:
+                session.execute(select(func.pg_advisory_xact_lock(GRADING_LOCK_NAMESPACE, solution_id)))
+            active = session.query(GradingJob.id) \
+                .filter(GradingJob.Solution_id == solution_id, GradingJob.status.in_(("queued", "running"))) \
+                .first()
+            if active is not None:
+                session.commit()
+                return active.id
+
+            session.add(GradingJob(
+                id=job_id,
+                status="queued",
+                User_id=user_id,
+                Task_id=task_id,
+                Solution_id=solution_id,
+            ))
+            session.commit()
+            return job_id
+        except Exception as e:
+            session.rollback()
+            print(f"Error adding grading job: {e}")
+            raise
+
+
+def claim_grading_job(worker: str) -> dict | None:
+    """
+    Забирает самое старое задание из очереди и помечает его выполняемым.
+    Строки, заблокированные другими воркерами, пропускаются (FOR UPDATE SKIP LOCKED),
+    поэтому одно задание достается только одному воркеру.
+
+    :param worker: Имя воркера, записывается в задание
+    :return: Словарь с данными задания и кодом решения или None, если очередь пуста
+    """
+    with Session() as session:
+        try:
+            row = session.query(GradingJob, Solution.code_hash) \
+                .join(Solution, Solution.id == GradingJob.Solution_id) \
+                .filter(GradingJob.status == "queued") \
+                .order_by(GradingJob.created_at) \
+                .limit(1) \
+                .with_for_update(of=GradingJob, skip_locked=True) \
+                .first()
+            if row is None:
+                return None
+
+            job, key = row
+            job.status = "running"
+            job.worker = worker
+            job.attempts += 1
+            job.started_at = func.now()
+            session.commit()
+            return {
+                "id": job.id,
+                "user_id": job.User_id,
+                "task_id": job.Task_id,
+                "solution_id": job.Solution_id,
+                "code": read_code(key),
+            }
+        except Exception as e:
+            session.rollback()
+            print(f"Error claiming grading job: {e}")
+            raise
+
+
+def touch_grading_job(job_id: str, worker: str) -> bool:
+    """
+    Продлевает выполнение задания: started_at обновляется, пока воркер проверяет решение,
+    поэтому долгая проверка не считается зависшей и не возвращается в очередь.
+
+    :param job_id: ID задания
+    :param worker: Имя воркера, который выполняет задание
+    :return: False, если задание уже не принадлежит воркеру (было возвращено в очередь или завершено)
+    """
+    with Session() as session:
+        try:
+            updated = session.query(GradingJob) \
+                .filter(GradingJob.id == job_id, GradingJob.worker == worker, GradingJob.status == "running") \
+                .update({GradingJob.started_at: func.now()}, synchronize_session=False)
+            session.commit()
+            return updated > 0
+        except Exception as e:
+            session.rollback()
+            print(f"Error touching grading job: {e}")
+            raise
+
+
+def finish_grading_job(job_id: str, worker: str, result: str | None = None, error: str | None = None) -> bool:
+    """
+    Записывает результат задания: статус done с результатом или error с текстом ошибки.
+    Результат записывается, только если задание выполняется этим воркером: задание, возвращенное в очередь
+    и забранное другим воркером, не перезаписывается.
+
+    :param job_id: ID задания
+    :param worker: Имя воркера, который выполнял задание
+    :param result: ResponseTest в JSON
+    :param error: Текст ошибки
+    :return: True, если результат записан
+    """
+    with Session() as session:
+        try:
+            updated = session.query(GradingJob) \
+                .filter(GradingJob.id == job_id, GradingJob.worker == worker, GradingJob.status == "running") \
+                .update({
+                    GradingJob.status: "error" if error is not None else "done",
+                    GradingJob.result: result,
+                    GradingJob.error: error,
+                    GradingJob.finished_at: func.now(),
+                }, synchronize_session=False)
+            session.commit()
+            return updated > 0
+        except Exception as e:
+            session.rollback()
+            print(f"Error finishing grading job: {e}")
+            raise
+
+
+def count_queued_grading_jobs() -> int:
+    """
+    Количество заданий, ожидающих проверки.
+    """
+    with Session() as session:
+        return session.query(func.count(GradingJob.id)).filter(GradingJob.status == "queued").scalar()
+
+
+def get_grading_job(job_id: str) -> dict | None:
+    """
+    Получает задание по ID.
+
+    :param job_id: ID задания
+    :return: Словарь с данными задания, если найдено, иначе None
+    """
+    with Session() as session:
+        job = session.query(GradingJob).filter_by(id=job_id).first()
+        if job:
+            return {
+                "id": job.id,
+                "user_id": job.User_id,
+                "task_id": job.Task_id,
+                "status": job.status,
+                "result": job.result,
+                "error": job.error,
+            }
+        return None
+
+
+def requeue_stale_grading_jobs(stale_after: int, max_attempts: int) -> int:
+    """
+    Возвращает в очередь задания, которые не продлевались дольше stale_after секунд (воркер упал или был остановлен).
+    Работающий воркер продлевает задание каждые stale_after / 3 секунд (touch_grading_job).
+    Задания, исчерпавшие max_attempts попыток, завершаются с ошибкой.
+
+    :return: Количество обработанных заданий
+    """
+    with Session() as session:
+        try:
+            stale = (GradingJob.status == "running") & \
+                    (GradingJob.started_at < func.now() - timedelta(seconds=stale_after))
+            failed = session.query(GradingJob) \
+                .filter(stale, GradingJob.attempts >= max_attempts) \
+                .update({
+                    GradingJob.status: "error",
+                    GradingJob.error: "Grading worker did not finish the job.",
+                    GradingJob.finished_at: func.now(),
+                }, synchronize_session=False)
+            requeued = session.query(GradingJob) \
+                .filter(stale) \
+                .update({GradingJob.status: "queued", GradingJob.worker: None}, synchronize_session=False)
+            session.commit()
+            return failed + requeued
+        except Exception as e:
+            session.rollback()
+            print(f"Error requeuing grading jobs: {e}")
+            raise
+
+
+def delete_finished_grading_jobs(ttl: int) -> int:
+    """
+    Удаляет завершенные задания старше ttl секунд.
+
+    :return: Количество удаленных заданий
+    """
+    with Session() as session:
+        try:
+            deleted = session.query(GradingJob) \
+                .filter(GradingJob.finished_at < func.now() - timedelta(seconds=ttl)) \
+                .delete(synchronize_session=False)
+            session.commit()
+            return deleted
+        except Exception as e:
+            session.rollback()
+            print(f"Error deleting grading jobs: {e}")
+            raise
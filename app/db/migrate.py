@@ -0,0 +1,97 @@
+"""
+Версионные миграции схемы БД.
+
+Миграции - SQL-файлы в app/init-scripts/migrations с именем <номер>_<описание>.sql, применяются по порядку номеров.
+Примененные версии записываются в таблицу schema_migrations, каждая миграция выполняется в отдельной транзакции.
+init.sql создает актуальную схему и сразу отмечает все миграции примененными.
+
+Запуск: python -m app.db.migrate [--list]
+"""
+import argparse
+from pathlib import Path
+
+from app.db.db import engine
+
+MIGRATIONS_DIR = Path(__file__).resolve().parent.parent / "init-scripts" / "migrations"
+# Ключ блокировки, чтобы миграции не применялись одновременно из нескольких процессов
+MIGRATION_LOCK_KEY = 1002
+
+CREATE_TABLE = """
+CREATE TABLE IF NOT EXISTS schema_migrations
+(
+    version    VARCHAR(128) PRIMARY KEY,
+    applied_at TIMESTAMP    NOT NULL DEFAULT now()
+)
+"""
+
+
+def available_migrations() -> list[tuple[str, Path]]:
+    """
+    :return: Список (версия, путь к файлу) по возрастанию версии
+    """
+    return sorted((path.stem, path) for path in MIGRATIONS_DIR.glob("*.sql"))
+
+
+def applied_migrations(cursor) -> set[str]:
+    cursor.execute("SELECT version FROM schema_migrations")
+    return {version for version, in cursor.fetchall()}
+
+
+def migrate() -> list[str]:
+    """
+    Применяет миграции, которых еще нет в schema_migrations.
+
+    :return: Список примененных версий
+    """
+    applied = []
+    connection = engine.raw_connection()
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(CREATE_TABLE)
+            connection.commit()
+
+            for version, path in available_migrations():
+                try:
+                    cursor.execute("SELECT pg_advisory_xact_lock(%s)", (MIGRATION_LOCK_KEY,))
+                    # Версия проверяется под блокировкой: другой процесс мог применить ее раньше
+                    if version in applied_migrations(cursor):
+                        connection.commit()
+                        continue
+                    cursor.execute(path.read_text(encoding="utf-8"))
+                    cursor.execute("INSERT INTO schema_migrations (version) VALUES (%s)", (version,))
+                    connection.commit()
+                    applied.append(version)
+                    print(f"Applied migration {version}")
+                except Exception as e:
+                    connection.rollback()
+                    print(f"Error applying migration {version}: {e}")
+                    raise
+    finally:
+        connection.close()
+    return applied
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Применение миграций схемы БД")
+    parser.add_argument("--list", action="store_true", help="Показать миграции и их состояние, не применяя их")
+    args = parser.parse_args()
+
+    if args.list:
+        connection = engine.raw_connection()
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute(CREATE_TABLE)
+                connection.commit()
+                applied = applied_migrations(cursor)
+        finally:
+            connection.close()
+        for version, _ in available_migrations():
+            print(f"{'applied' if version in applied else 'pending'}  {version}")
+        return
+
+    if not migrate():
+        print("No pending migrations")
+
+
+if __name__ == "__main__":
+    main()
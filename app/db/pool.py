@@ -0,0 +1,69 @@
+import time
+
+from sqlalchemy import event, exc
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+from app.core.metrics import Counter, Gauge, Histogram, registry
+
+
+class _WaitTiming:
+    """
+    Замер времени ожидания соединения и счетчик таймаутов для пулов очередью.
+    Метрики пул получает в register_pool_metrics, до этого замеры не ведутся.
+    """
+
+    wait_seconds: Histogram | None = None
+    timeouts_total: Counter | None = None
+
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            return super().connect()
+        except exc.TimeoutError:
+            if self.timeouts_total is not None:
+                self.timeouts_total.inc()
+            raise
+        finally:
+            if self.wait_seconds is not None:
+                self.wait_seconds.observe(time.perf_counter() - start)
+
+
+class InstrumentedQueuePool(_WaitTiming, QueuePool):
+    pass
+
+
+class InstrumentedAsyncQueuePool(_WaitTiming, AsyncAdaptedQueuePool):
+    pass
+
+
+def register_pool_metrics(engine: Engine, prefix: str = "sdo_db_pool") -> None:
+    """
+    Метрики пула соединений: время ожидания соединения, таймауты, занятые и свободные соединения,
+    соединения сверх pool_size.
+
+    :param engine: Движок, для асинхронного - его sync_engine
+    :param prefix: Префикс имен метрик, у каждого пула свой
+    """
+    pool = engine.pool
+    pool.wait_seconds = registry.register(Histogram(
+        f"{prefix}_wait_seconds", "Время получения соединения из пула БД"
+    ))
+    pool.timeouts_total = registry.register(Counter(
+        f"{prefix}_timeouts_total", "Запросы соединения, не дождавшиеся свободного соединения за pool_timeout"
+    ))
+    pool_overflow_total = registry.register(Counter(
+        f"{prefix}_overflow_total", "Соединения, открытые сверх pool_size"
+    ))
+
+    @event.listens_for(pool, "connect")
+    def on_connect(dbapi_connection, connection_record):
+        # Счетчик переполнения увеличивается до открытия соединения
+        if pool.overflow() > 0:
+            pool_overflow_total.inc()
+
+    registry.register(Gauge(f"{prefix}_size", "Размер пула соединений БД", pool.size))
+    registry.register(Gauge(f"{prefix}_checked_out", "Соединения БД, выданные из пула", pool.checkedout))
+    registry.register(Gauge(f"{prefix}_idle", "Свободные соединения БД в пуле", pool.checkedin))
+    registry.register(Gauge(f"{prefix}_overflow", "Открытые соединения сверх pool_size",
+                            lambda: max(0, pool.overflow())))
@@ -0,0 +1,180 @@
+"""
+Индекс похожих решений: сигнатуры и LSH-корзины решений.
+
+Новые решения индексируются при добавлении (add_solution). Решения, загруженные до появления индекса,
+индексируются один раз командой: python -m app.db.similarity_methods [--task-id ID]
+"""
+import argparse
+
+from sqlalchemy import func
+from sqlalchemy.orm import aliased
+
+from app.db.code_methods import read_codes
+from app.db.db import Session, Solution, SolutionBucket, SolutionSignature, User
+from app.testing_pyfiles.similarity import bands, pack, signature, similarity, unpack
+
+
+def index_solution(session: Session, solution_id: int, task_id: int, code: str):
+    """
+    Добавляет в сессию сигнатуру и LSH-корзины решения. Коммит выполняет вызывающий код.
+    """
+    sig = signature(code)
+    session.add(SolutionSignature(Solution_id=solution_id, Task_id=task_id, signature=pack(sig)))
+    session.add_all(
+        SolutionBucket(Solution_id=solution_id, band=band, bucket=bucket, Task_id=task_id)
+        for band, bucket in enumerate(bands(sig))
+    )
+
+
+def _unindexed(session: Session):
+    return session.query(Solution.id, Solution.code_hash) \
+        .outerjoin(SolutionSignature, SolutionSignature.Solution_id == Solution.id) \
+        .filter(SolutionSignature.Solution_id.is_(None))
+
+
+def index_task_solutions(task_id: int) -> int:
+    """
+    Строит сигнатуры решений задачи, которые еще не проиндексированы (например, загружены до появления индекса).
+
+    :param task_id: ID задачи
+    :return: Количество проиндексированных решений
+    """
+    with Session() as session:
+        try:
+            solutions = _unindexed(session).filter(Solution.Task_id == task_id).all()
+            codes = read_codes(key for _, key in solutions)
+            for solution_id, key in solutions:
+                index_solution(session, solution_id, task_id, codes[key])
+            session.commit()
+            return len(solutions)
+        except Exception as e:
+            session.rollback()
+            print(f"Error indexing solutions for task {task_id}: {e}")
+            raise
+
+
+def _signatures(session: Session, solution_ids) -> dict[int, tuple[list[int], int, str]]:
+    rows = session.query(SolutionSignature.Solution_id, SolutionSignature.signature, User.id, User.username) \
+        .join(Solution, Solution.id == SolutionSignature.Solution_id) \
+        .join(User, User.id == Solution.User_id) \
+        .filter(SolutionSignature.Solution_id.in_(solution_ids)) \
+        .all()
+    return {solution_id: (unpack(sig), user_id, username) for solution_id, sig, user_id, username in rows}
+
+
+def find_similar_solutions(solution_id: int, threshold: float, limit: int) -> list[dict] | None:
+    """
+    Находит решения других студентов по той же задаче, похожие на данное.
+    Сравниваются только решения, попавшие с ним хотя бы в одну LSH-корзину.
+
+    :param solution_id: ID решения
+    :param threshold: Минимальная оценка сходства от 0 до 1
+    :param limit: Максимальное количество результатов
+    :return: Список словарей по убыванию сходства или None, если решение не найдено
+    """
+    with Session() as session:
+        solution = session.query(Solution).filter_by(id=solution_id).first()
+        if not solution:
+            return None
+        if solution.Task_id is None:
+            return []
+        if session.query(SolutionSignature).filter_by(Solution_id=solution_id).first() is None:
+            index_solution(session, solution.id, solution.Task_id, solution.code)
+            session.commit()
+
+        own, other = aliased(SolutionBucket), aliased(SolutionBucket)
+        candidates = session.query(other.Solution_id) \
+            .join(own, (own.Task_id == other.Task_id) & (own.band == other.band) & (own.bucket == other.bucket)) \
+            .filter(own.Solution_id == solution_id, other.Solution_id != solution_id) \
+            .distinct() \
+            .all()
+        signatures = _signatures(session, [candidate_id for candidate_id, in candidates] + [solution_id])
+
+    own_sig, user_id, _ = signatures.pop(solution_id)
+    similar = []
+    for candidate_id, (sig, candidate_user_id, username) in signatures.items():
+        # Решения того же студента не считаются списанными
+        if candidate_user_id == user_id:
+            continue
+        score = similarity(own_sig, sig)
+        if score >= threshold:
+            similar.append({
+                "solution_id": candidate_id,
+                "user_id": candidate_user_id,
+                "username": username,
+                "similarity": score,
+            })
+    similar.sort(key=lambda item: (-item["similarity"], item["solution_id"]))
+    return similar[:limit]
+
+
+def find_similar_pairs(task_id: int, threshold: float, limit: int) -> list[dict]:
+    """
+    Находит пары похожих решений задачи среди последних решений студентов.
+    Пары-кандидаты выбираются самосоединением LSH-корзин по индексу, а не перебором всех пар.
+
+    :param task_id: ID задачи
+    :param threshold: Минимальная оценка сходства от 0 до 1
+    :param limit: Максимальное количество пар
+    :return: Список словарей по убыванию сходства
+    """
+    with Session() as session:
+        latest_ids = session.query(func.max(Solution.id)) \
+            .filter(Solution.Task_id == task_id) \
+            .group_by(Solution.User_id)
+        first, second = aliased(SolutionBucket), aliased(SolutionBucket)
+        pairs = session.query(first.Solution_id, second.Solution_id) \
+            .join(second, (second.Task_id == first.Task_id) & (second.band == first.band)
+                  & (second.bucket == first.bucket) & (second.Solution_id > first.Solution_id)) \
+            .filter(first.Task_id == task_id, first.Solution_id.in_(latest_ids), second.Solution_id.in_(latest_ids)) \
+            .distinct() \
+            .all()
+        signatures = _signatures(session, {solution_id for pair in pairs for solution_id in pair})
+
+    similar = []
+    for first_id, second_id in pairs:
+        first_sig, first_user_id, first_username = signatures[first_id]
+        second_sig, second_user_id, second_username = signatures[second_id]
+        score = similarity(first_sig, second_sig)
+        if score >= threshold:
+            similar.append({
+                "first_solution_id": first_id,
+                "first_user_id": first_user_id,
+                "first_username": first_username,
+                "second_solution_id": second_id,
+                "second_user_id": second_user_id,
+                "second_username": second_username,
+                "similarity": score,
+            })
+    similar.sort(key=lambda item: (-item["similarity"], item["first_solution_id"], item["second_solution_id"]))
+    return similar[:limit]
+
+
+def unindexed_task_ids() -> list[int]:
+    """
+    :return: ID задач, у которых есть решения без сигнатуры
+    """
+    with Session() as session:
+        rows = _unindexed(session).with_entities(Solution.Task_id) \
+            .filter(Solution.Task_id.isnot(None)) \
+            .distinct() \
+            .all()
+        return sorted(task_id for task_id, in rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Индексация решений для поиска похожих")
+    parser.add_argument("--task-id", type=int, help="Только решения этой задачи")
+    args = parser.parse_args()
+
+    task_ids = [args.task_id] if args.task_id is not None else unindexed_task_ids()
+    total = 0
+    for task_id in task_ids:
+        count = index_task_solutions(task_id)
+        total += count
+        print(f"Task {task_id}: indexed {count} solutions")
+    print(f"Indexed {total} solutions")
+
+
+if __name__ == "__main__":
+    main()
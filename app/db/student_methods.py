@@ -1,7 +1,8 @@
 from typing import Type, Union
+from app.db.code_methods import read_codes
 from app.db.db import Group, GroupSubject, Session, Solution, Subject, User, Task
 from app.db.group_methods import get_groups_by_faculty
-from app.db.task_methods import is_task_completed
+from app.db.task_methods import get_tasks_progress
 from app.schemas.subject import LabStatus
 from app.schemas.task import SolutionInfo, TaskInfo
 from app.schemas.users import UserInfo
@@ -78,32 +79,7 @@ def get_student_tasks_with_status(user_id: int) -> list[tuple[int, str, bool]]:
     Returns:
         Список кортежей (task_id, task_name, is_completed)
     """
-    with Session() as session:
-        # Получаем все subject_id, связанные с пользователем
-        user_group = session.query(User).filter_by(id=user_id).first()
-        student_subjects = session.query(GroupSubject.subject_id) \
-            .filter(GroupSubject.group_id == user_group.group_rel.id) \
-            .all()
-
-        if not student_subjects:
-            return []
-
-        # Извлекаем только subject_id из результатов запроса
-        subject_ids = [subj.subject_id for subj in student_subjects]
-
-        # Получаем все задания, связанные с этими subject_id
-        tasks = session.query(Task) \
-            .filter(Task.Subject_id.in_(subject_ids), Task.status=='published') \
-            .order_by(Task.id) \
-            .all()
-
-        # Формируем результат с информацией о выполнении
-        result = []
-        for task in tasks:
-            completed = is_task_completed(session, user_id, task.id)
-            result.append((task.id, task.name, completed))
-
-        return result
+    return get_tasks_progress([user_id], published_only=True).get(user_id, [])
 
 def get_student_labs_by_subject(student_id: int, subject_id: int) -> list[LabStatus]:
     """
@@ -191,6 +167,8 @@ def get_student_labs(student_id: int, lab_id: int) -> TaskInfo | str:
 
         if not solutions:
             return f"No solutions found for student with ID {student_id} and task with ID {lab_id}."
+        # Код всех решений загружается одним запросом
+        read_codes(solution.code_hash for solution in solutions)
         print([(solution.code, solution.status) for solution in solutions])
         # Формируем список решений
         solutions_list = [
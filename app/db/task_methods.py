@@ -1,27 +1,34 @@
-from app.db.db import Session, Solution, Subject, TestCase
-from app.db.subject_methods import get_subject_id_by_task
+from sqlalchemy import exists, func, select
+from sqlalchemy.orm import joinedload
+
+from app.db.code_methods import read_codes
+from app.db.db import GroupSubject, Session, Solution, Subject, TestCase
 from app.schemas.task import Task as TaskSchema, TaskInfo, SolutionInfo
 from app.db.db import Task, User
 
 
-def get_task_data(task_id: int) -> dict | None:
+def get_grading_data(task_id: int) -> tuple[dict, list[TestCase]] | None:
     """
-    Получает данные задачи по её ID.
+    Получает одним запросом данные задачи и её тестовые случаи для построения плана проверки.
 
     :param task_id: ID задачи
-    :return: Словарь с данными задачи, если найдена, иначе None
+    :return: Кортеж (данные задачи, тестовые случаи по возрастанию ID), если задача найдена, иначе None
     """
     with Session() as session:
-        task = session.query(Task).filter_by(id=task_id).first()
-        if task:
-            return {
-                "id": task.id,
-                "name": task.name,
-                "description": task.description,
-                "teacher_formula": task.teacher_formula,
-                "input_variables": task.input_variables
-            }
-        return None
+        task = session.query(Task).options(joinedload(Task.testCases)).filter_by(id=task_id).first()
+        if not task:
+            return None
+        task_data = {
+            "id": task.id,
+            "subject_id": task.Subject_id,
+            "status": task.status,
+            "teacher_formula": task.teacher_formula,
+            "input_variables": task.input_variables,
+            "time_limit": task.time_limit,
+            "memory_limit": task.memory_limit,
+            "output_limit": task.output_limit
+        }
+        return task_data, sorted(task.testCases, key=lambda test_case: test_case.id)
 
 
 def get_tasks_by_subject(subject_id: int) -> str | list[Task]:
@@ -50,6 +57,35 @@ def get_tasks_by_subject(subject_id: int) -> str | list[Task]:
             return str(e)
 
 
+def get_subject_tasks_with_status(subject_id: int, user_id: int) -> list[TaskSchema]:
+    """
+    Получает одним запросом опубликованные задачи предмета со статусом выполнения пользователем.
+    Код решений не читается: статус определяется через EXISTS по успешным решениям,
+    скрытые пользователем решения не учитываются (как в get_user_solutions_by_task).
+
+    :param subject_id: ID предмета
+    :param user_id: ID пользователя
+    :return: Список задач по возрастанию ID, пустой, если предмет не найден или в нем нет задач
+    """
+    passed = exists().where(
+        Solution.User_id == user_id,
+        Solution.Task_id == Task.id,
+        Solution.is_hidden.is_(False),
+        Solution.status == "Success"
+    )
+    with Session() as session:
+        rows = session.execute(
+            select(Task.id, Task.name, Task.description, passed)
+            .filter(Task.Subject_id == subject_id, Task.status == 'published')
+            .order_by(Task.id)
+        ).all()
+
+    return [
+        TaskSchema(id=task_id, name=name, description=description, status="Success" if is_passed else "Failed")
+        for task_id, name, description, is_passed in rows
+    ]
+
+
 def get_test_cases_by_task(task_id):
     """
     Получает все тестовые случаи, связанные с задачей по её ID.
@@ -66,7 +102,7 @@ def get_test_cases_by_task(task_id):
                 raise ValueError(f"Task with ID {task_id} not found.")
 
             # Извлекаем все тестовые случаи, связанные с данной задачей
-            test_cases = session.query(TestCase).filter_by(Task_id=task_id).all()
+            test_cases = session.query(TestCase).filter_by(Task_id=task_id).order_by(TestCase.id).all()
 
             # Если тестовые случаи не найдены, возвращаем пустой список
             if not test_cases:
@@ -99,54 +135,13 @@ def get_user_solutions_by_task(user_id, task_id):
                 print(f"No solutions found for user {user_id} and task {task_id}.")
                 return []
 
+            # Код всех решений загружается одним запросом
+            read_codes(solution.code_hash for solution in solutions)
             return solutions
         except Exception as e:
             print(f"Error retrieving solutions for user {user_id} and task {task_id}: {e}")
             raise
 
-def add_solution(code, user_id, task_id) -> str | bool:
-    """
-    Добавляет решение в базу данных.
-
-    :param code: Код решения (обязательное поле)
-    :param user_id: ID пользователя (обязательное поле)
-    :param task_id: ID задачи (обязательное поле)
-    :raises ValueError: Если код решения не указан
-    """
-    if not code:
-        return "Code is a required field."
-
-    # Получение subject_id по task_id
-    subject_id = get_subject_id_by_task(task_id)
-    if not subject_id:
-        return "Task not found."
-
-    # Проверка, прикреплен ли пользователь к предмету
-    with Session() as session:
-        user = session.query(User).filter_by(id=user_id).first()
-        if not user:
-            return "User not found."
-
-        group_subject_ids = [gs.subject_id for gs in user.group_rel.subjects_link]
-        if subject_id not in group_subject_ids:
-            return "User is not enrolled in the subject."
-
-    # Создание сессии
-    with Session() as session:
-        try:
-            # Создание нового решения
-            solution = Solution(
-                code=code,
-                User_id=user_id,  # Привязка к пользователю
-                Task_id=task_id  # Привязка к задаче
-            )
-            session.add(solution)
-            session.commit()
-            return True
-        except Exception as e:
-            session.rollback()
-            return "Error adding solution"
-
 
 def update_solution_status(solution_id: int, status: str):
     with Session() as session:
@@ -161,6 +156,49 @@ def update_solution_status(solution_id: int, status: str):
             raise
 
 
+def get_latest_solutions_by_task(task_id: int) -> list[tuple[int, str]]:
+    """
+    Получает последнее решение каждого пользователя для задачи одним запросом.
+
+    :param task_id: ID задачи
+    :return: Список пар (ID решения, код решения) по возрастанию ID
+    """
+    with Session() as session:
+        latest_ids = session.query(func.max(Solution.id)) \
+            .filter(Solution.Task_id == task_id) \
+            .group_by(Solution.User_id)
+        solutions = session.query(Solution.id, Solution.code_hash) \
+            .filter(Solution.id.in_(latest_ids)) \
+            .order_by(Solution.id) \
+            .all()
+    # Одинаковый код у разных студентов читается и распаковывается один раз
+    codes = read_codes(key for _, key in solutions)
+    return [(solution_id, codes[key]) for solution_id, key in solutions]
+
+
+def update_solutions_status(statuses: dict[int, str]):
+    """
+    Обновляет статусы нескольких решений: один UPDATE на каждое значение статуса.
+
+    :param statuses: Словарь {ID решения: статус}
+    """
+    solution_ids_by_status: dict[str, list[int]] = {}
+    for solution_id, status in statuses.items():
+        solution_ids_by_status.setdefault(status, []).append(solution_id)
+
+    with Session() as session:
+        try:
+            for status, solution_ids in solution_ids_by_status.items():
+                session.query(Solution) \
+                    .filter(Solution.id.in_(solution_ids)) \
+                    .update({Solution.status: status}, synchronize_session=False)
+            session.commit()
+        except Exception as e:
+            session.rollback()
+            print(f"Error updating solutions status: {e}")
+            raise
+
+
 def update_solution_hidden(user_id: int, solution_id: int):
     """Скрывает solution пользователя. Возвращает True, если успешно."""
     with Session() as session:
@@ -211,26 +249,13 @@ def get_solutions_by_user(user_id):
                 print(f"No solutions found for user with ID {user_id}.")
                 return []
 
+            read_codes(solution.code_hash for solution in solutions)
             return solutions
         except Exception as e:
             print(f"Error retrieving solutions for user with ID {user_id}: {e}")
             raise
 
 
-def get_latest_solution(user_id: int, task_id: int) -> Solution | None:
-    """
-    Получает последнее решение пользователя для конкретной задачи.
-
-    :param user_id: ID пользователя
-    :param task_id: ID задачи
-    :return: Последнее решение пользователя, если найдено, иначе None
-    """
-    with Session() as session:
-        solution = session.query(Solution).filter_by(User_id=user_id, Task_id=task_id).order_by(
-            Solution.id.desc()).first()
-        return solution
-
-
 def evaluate_solution(solution_id, new_mark):
     """
     Оценка решения пользователя для заданного решения.
@@ -258,25 +283,39 @@ def evaluate_solution(solution_id, new_mark):
             print(f"Error evaluating solution for {solution_id}: {e}")
             raise
 
-def is_task_completed(session: Session, user_id: int, task_id: int) -> bool:
-    """
-    Проверяет, выполнено ли задание студентом.
 
-    Args:
-        session: Сессия SQLAlchemy
-        user_id: ID студента
-        task_id: ID задания
+def tasks_progress_query(user_ids, published_only: bool = False):
+    """
+    Запрос заданий дисциплин группы каждого студента с признаком выполнения.
+    Задание выполнено, если у студента есть хотя бы одно успешное решение (индекс ix_Solution_success).
+    """
+    completed = exists().where(
+        Solution.User_id == User.id,
+        Solution.Task_id == Task.id,
+        Solution.status == "Success"
+    )
+    query = select(User.id, Task.id, Task.name, completed) \
+        .join(GroupSubject, GroupSubject.group_id == User.studyGroup) \
+        .join(Task, Task.Subject_id == GroupSubject.subject_id) \
+        .filter(User.id.in_(user_ids))
+    if published_only:
+        query = query.filter(Task.status == 'published')
+    return query.order_by(User.id, Task.id)
+
+
+def get_tasks_progress(user_ids, published_only: bool = False) -> dict[int, list[tuple[int, str, bool]]]:
+    """
+    Получает одним запросом задания студентов с признаком выполнения.
 
-    Returns:
-        True если есть хотя бы одно успешное решение, иначе False
+    :param user_ids: ID студентов
+    :param published_only: Только опубликованные задания
+    :return: Словарь {user_id: [(task_id, task_name, is_completed), ...]} по возрастанию ID задания,
+             студенты без заданий в словарь не попадают
     """
-    # Проверяем наличие успешных решений (autoTestResult = 1)
-    solution = session.query(Solution) \
-        .filter(
-        Solution.User_id == user_id,
-        Solution.Task_id == task_id,
-        Solution.status == "Success"  # 1 означает успешное выполнение
-    ) \
-        .first()
+    with Session() as session:
+        rows = session.execute(tasks_progress_query(user_ids, published_only)).all()
 
-    return solution is not None
\ No newline at end of file
+    progress = {}
+    for user_id, task_id, task_name, is_completed in rows:
+        progress.setdefault(user_id, []).append((task_id, task_name, is_completed))
+    return progress
\ No newline at end of file
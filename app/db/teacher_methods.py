@@ -1,7 +1,7 @@
 from typing import Union
 
 from app.db.db import Group, GroupSubject, Session, Subject, TestCase, User
-from app.db.task_methods import is_task_completed
+from app.db.task_methods import get_tasks_progress
 from app.schemas.subject import SubjectInfo
 from app.db.db import Task
 from app.schemas.teachers import TaskWithTestCasesSchema, UpdateLabRequest
@@ -107,6 +107,9 @@ def create_laboratory(task: TaskWithTestCasesSchema):
                 Subject_id=task.subject_id,
                 teacher_formula=task.teacher_formula,
                 input_variables=task.input_variables,
+                time_limit=task.time_limit,
+                memory_limit=task.memory_limit,
+                output_limit=task.output_limit,
                 status='unpublished'
             )
             session.add(lab)
@@ -133,6 +136,30 @@ def create_laboratory(task: TaskWithTestCasesSchema):
             return None
 
 
+def add_file_test_case(task_id: int, inp_path: str, out_path: str) -> int | None:
+    """
+    Добавляет к лабораторной работе тест-кейс с данными в файлах.
+
+    :param task_id: ID лабораторной работы
+    :param inp_path: Путь к файлу входных данных относительно каталога тестовых данных
+    :param out_path: Путь к файлу ожидаемого вывода относительно каталога тестовых данных
+    :return: id созданного тест-кейса или None, если лабораторная работа не найдена
+    :raises Exception: Ошибка БД при добавлении тест-кейса
+    """
+    with Session() as session:
+        try:
+            if not session.query(Task.id).filter_by(id=task_id).first():
+                return None
+            test = TestCase(inp="", out="", inp_path=inp_path, out_path=out_path, Task_id=task_id)
+            session.add(test)
+            session.commit()
+            return test.id
+        except Exception as e:
+            session.rollback()
+            print(f"Ошибка при добавлении тест-кейса: {e}")
+            raise
+
+
 def get_laboratories():
     """
     Получает список всех лабораторных работ с базовой информацией.
@@ -234,32 +261,7 @@ def get_student_tasks_with_status(user_id: int) -> list[tuple[int, str, bool]]:
     Returns:
         Список кортежей (task_id, task_name, is_completed)
     """
-    with Session() as session:
-        # Получаем все subject_id, связанные с пользователем
-        user_group = session.query(User).filter_by(id=user_id).first()
-        student_subjects = session.query(GroupSubject.subject_id) \
-            .filter(GroupSubject.group_id == user_group.group_rel.id) \
-            .all()
-
-        if not student_subjects:
-            return []
-
-        # Извлекаем только subject_id из результатов запроса
-        subject_ids = [subj.subject_id for subj in student_subjects]
-
-        # Получаем все задания, связанные с этими subject_id
-        tasks = session.query(Task) \
-            .filter(Task.Subject_id.in_(subject_ids)) \
-            .order_by(Task.id) \
-            .all()
-
-        # Формируем результат с информацией о выполнении
-        result = []
-        for task in tasks:
-            completed = is_task_completed(session, user_id, task.id)
-            result.append((task.id, task.name, completed))
-
-        return result
+    return get_tasks_progress([user_id], published_only=False).get(user_id, [])
 
 def get_lab_details(lab_id: int) -> dict | None:
     """
@@ -282,6 +284,9 @@ def get_lab_details(lab_id: int) -> dict | None:
                 "teacher_formula": lab.teacher_formula,
                 "input_variables": lab.input_variables,
                 "subject_id": lab.Subject_id,
+                "time_limit": lab.time_limit,
+                "memory_limit": lab.memory_limit,
+                "output_limit": lab.output_limit,
                 "test_cases": []
             }
 
@@ -291,7 +296,9 @@ def get_lab_details(lab_id: int) -> dict | None:
                 lab_details["test_cases"].append({
                     "id": test_case.id,
                     "input": test_case.inp,
-                    "output": test_case.out
+                    "output": test_case.out,
+                    "inp_path": test_case.inp_path,
+                    "out_path": test_case.out_path
                 })
 
             return lab_details
@@ -300,33 +307,53 @@ def get_lab_details(lab_id: int) -> dict | None:
             print(f"Error retrieving unpublished lab details: {e}")
             return None
 
-def edit_lab(task_id: int, lab: UpdateLabRequest):
+def edit_lab(task_id: int, lab: UpdateLabRequest) -> list[str] | None:
     """
     Обновляет информацию о лабораторной работе и её тест-кейсах.
+    Тесты без файлов заменяются переданными. Тесты с данными в файлах загружаются отдельно:
+    сохраняются те, чей id есть в запросе, остальные удаляются.
 
     :param task_id: ID лабораторной работы
     :param lab: UpdateLabRequest с новыми данными
-    :return: True, если обновление прошло успешно, иначе False
+    :return: Пути к файлам удаленных тестов (их удаляет вызывающий код) или None при ошибке
     """
     with Session() as session:
         try:
             # Получаем лабораторную работу по ID
             lab_to_update = session.query(Task).filter_by(id=task_id).first()
             if not lab_to_update:
-                return False
+                return None
 
             # Обновляем данные лабораторной работы
             lab_to_update.name = lab.task.name
             lab_to_update.description = lab.task.description
             lab_to_update.teacher_formula = lab.task.teacher_formula
             lab_to_update.input_variables = lab.task.input_variables
+            lab_to_update.time_limit = lab.task.time_limit
+            lab_to_update.memory_limit = lab.task.memory_limit
+            lab_to_update.output_limit = lab.task.output_limit
             lab_to_update.Subject_id = lab.task.subject_id
 
-            # Удаляем старые тест-кейсы
-            session.query(TestCase).filter_by(Task_id=task_id).delete()
-
-            # Добавляем новые тест-кейсы
+            # Удаляем старые тест-кейсы без файлов
+            session.query(TestCase).filter(TestCase.Task_id == task_id, TestCase.inp_path.is_(None)).delete()
+
+            # Удаляем тесты с файлами, которых нет в запросе
+            file_cases = session.query(TestCase) \
+                .filter(TestCase.Task_id == task_id, TestCase.inp_path.isnot(None)) \
+                .all()
+            file_case_ids = {test_case.id for test_case in file_cases}
+            kept_ids = {test_case.id for test_case in lab.task.test_cases}
+            removed_paths = []
+            for test_case in file_cases:
+                if test_case.id not in kept_ids:
+                    removed_paths += [test_case.inp_path, test_case.out_path]
+                    session.delete(test_case)
+
+            # Добавляем новые тест-кейсы. Тесты с файлами (в ответе get_lab_details у них пустые inp и out)
+            # повторно не создаются
             for test_case in lab.task.test_cases:
+                if test_case.inp_path or test_case.id in file_case_ids:
+                    continue
                 new_test_case = TestCase(
                     inp=test_case.inp,
                     out=test_case.out,
@@ -336,9 +363,9 @@ def edit_lab(task_id: int, lab: UpdateLabRequest):
 
             # Сохраняем изменения в базе данных
             session.commit()
-            return True
+            return [path for path in removed_paths if path]
 
         except Exception as e:
             session.rollback()
             print(f"Ошибка при обновлении лабораторной работы: {e}")
-            return False
\ No newline at end of file
+            return None
\ No newline at end of file
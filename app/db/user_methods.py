@@ -1,9 +1,8 @@
 from sqlite3 import IntegrityError
 from typing import Any, Union
-from app.db.db import Group, GroupSubject, Session, Subject, TeacherHasGroups, User, Task
+from app.db.db import Group, Session, Subject, TeacherHasGroups, User, Task
 from app.db.group_methods import get_group_id
 from app.schemas.auth import RegisterRequest
-from app.schemas.subject import SubjectInfo
 from app.schemas.users import User as UserSchema
 
 
@@ -196,34 +195,6 @@ def add_user(register_data: RegisterRequest) -> Union[dict, str]:
             session.rollback()
             return "User not added"
 
-def get_user_subjects(username: str) -> list[SubjectInfo]:
-    """
-    Получает все дисциплины, на которые зачислен пользователь (без фильтрации по статусу лабораторных).
-
-    :param username:
-    :return: Список дисциплин, на которые зачислен пользователь
-    """
-    with Session() as session:
-        try:
-            user = session.query(User).filter_by(username=username).first()
-            if not user or not user.group_rel:
-                return []
-
-            # Получаем id всех предметов группы пользователя
-            group_subject_ids = session.query(GroupSubject.subject_id).filter_by(group_id=user.group_rel.id).all()
-            subject_ids = [item.subject_id for item in group_subject_ids]
-
-            # Получаем все предметы по id
-            subjects = (
-                session.query(Subject)
-                .filter(Subject.id.in_(subject_ids))
-                .all()
-            )
-
-            return [SubjectInfo(id=subject.id, name=subject.name, grade=0) for subject in subjects]
-
-        except Exception:
-            return []
 
 def get_user_data(username: str) -> UserSchema:
     """
@@ -257,46 +228,3 @@ def get_user_data(username: str) -> UserSchema:
             )
         return UserSchema()  # Предполагается, что UserSchema имеет значения по умолчанию
 
-def is_user_enrolled_in_subject(username: str, subject_id: int) -> bool | str:
-    """
-    Проверяет, зачислен ли пользователь на предмет по его ID.
-
-    :param username:
-    :param subject_id: ID или имя предмета
-    :return: True, если пользователь зачислен на предмет, иначе False
-    """
-    with Session() as session:
-        try:
-            user = session.query(User).filter_by(username=username).first()
-            if not user:
-                return "User not found"
-
-            user_subject_list = [subject.id for subject in user.group_rel.subjects]
-
-            if not user_subject_list:
-                return "No subjects found"
-
-            return subject_id in user_subject_list
-
-        except Exception as e:
-            return f"Error checking enrollment for user {username} in subject {subject_id}: {e}"
-
-def validate_user(username: str, password: str) -> Union[dict, bool]:
-    """
-    Validates the username and password of a user.
-
-    :param username: The username of the user.
-    :param password: The password of the user.
-    :return: True if the username and password match, False otherwise.
-    """
-    with Session() as session:
-        user = session.query(User).filter_by(username=username).first()
-        if user and user.password == password:
-            return {
-                "user_id": user.id,
-                "username": user.username,
-                "roleType": user.roleType,
-                "studyGroup": user.studyGroup
-            }
-        return False
-
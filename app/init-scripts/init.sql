@@ -1,5 +1,10 @@
+DROP TABLE IF EXISTS schema_migrations CASCADE;
+DROP TABLE IF EXISTS "GradingJob" CASCADE;
+DROP TABLE IF EXISTS "SolutionBucket" CASCADE;
+DROP TABLE IF EXISTS "SolutionSignature" CASCADE;
 DROP TABLE IF EXISTS "TestCase" CASCADE;
 DROP TABLE IF EXISTS "Solution" CASCADE;
+DROP TABLE IF EXISTS "SolutionCode" CASCADE;
 DROP TABLE IF EXISTS "Task" CASCADE;
 DROP TABLE IF EXISTS "Faculty" CASCADE;
 DROP TABLE IF EXISTS "Group" CASCADE;
@@ -21,6 +26,8 @@ CREATE TABLE "Group"
     faculty INTEGER REFERENCES "Faculty" (id)
 );
 
+CREATE INDEX "ix_Group_faculty" ON "Group" (faculty);
+
 CREATE TABLE "User"
 (
     id             SERIAL PRIMARY KEY,
@@ -34,6 +41,8 @@ CREATE TABLE "User"
     middle_name    VARCHAR(64)                 DEFAULT 'Не указано'
 );
 
+CREATE INDEX "ix_User_studyGroup" ON "User" ("studyGroup");
+
 CREATE TABLE "TeacherHasGroups"
 (
     id         SERIAL PRIMARY KEY,
@@ -64,13 +73,27 @@ CREATE TABLE "Task"
     teacher_formula VARCHAR,
     input_variables VARCHAR,
     status          VARCHAR CHECK ( status IN ('published', 'unpublished') ),
+    time_limit      INTEGER,
+    memory_limit    INTEGER,
+    output_limit    INTEGER,
     "Subject_id"    INTEGER      NOT NULL REFERENCES "Subject" (id) ON DELETE CASCADE
 );
 
+CREATE INDEX "ix_Task_subject_status" ON "Task" ("Subject_id", status);
+
+-- Исходный код решений, одна строка на уникальное содержимое (SHA-256), сжатие zlib
+CREATE TABLE "SolutionCode"
+(
+    hash        VARCHAR(64) PRIMARY KEY,
+    data        BYTEA       NOT NULL,
+    compression VARCHAR(8)  NOT NULL DEFAULT 'zlib',
+    size        INTEGER     NOT NULL
+);
+
 CREATE TABLE "Solution"
 (
     id                  SERIAL PRIMARY KEY,
-    code                TEXT    NOT NULL,
+    code_hash           VARCHAR(64) NOT NULL REFERENCES "SolutionCode" (hash),
     mark                INTEGER,
     is_hidden           BOOLEAN DEFAULT false,
     "lengthTestResult"  BOOLEAN,
@@ -81,14 +104,76 @@ CREATE TABLE "Solution"
     "Task_id"           INTEGER REFERENCES "Task" (id) ON DELETE CASCADE
 );
 
+CREATE INDEX "ix_Solution_code_hash" ON "Solution" (code_hash);
+-- Решения пользователя по задаче и последнее решение
+CREATE INDEX "ix_Solution_user_task" ON "Solution" ("User_id", "Task_id", id DESC);
+-- Проверка, сдана ли задача
+CREATE INDEX "ix_Solution_success" ON "Solution" ("User_id", "Task_id") WHERE status = 'Success';
+
 CREATE TABLE "TestCase"
 (
     id        SERIAL PRIMARY KEY,
     inp       VARCHAR(512) NOT NULL,
     out       VARCHAR(512) NOT NULL,
+    inp_path  VARCHAR(512),
+    out_path  VARCHAR(512),
     "Task_id" INTEGER REFERENCES "Task" (id) ON DELETE CASCADE
 );
 
+CREATE INDEX "ix_TestCase_Task_id" ON "TestCase" ("Task_id");
+
+-- MinHash-сигнатуры решений и LSH-корзины для поиска похожих решений
+CREATE TABLE "SolutionSignature"
+(
+    "Solution_id" INTEGER PRIMARY KEY REFERENCES "Solution" (id) ON DELETE CASCADE,
+    "Task_id"     INTEGER NOT NULL REFERENCES "Task" (id) ON DELETE CASCADE,
+    signature     BYTEA   NOT NULL
+);
+
+CREATE TABLE "SolutionBucket"
+(
+    "Solution_id" INTEGER NOT NULL REFERENCES "Solution" (id) ON DELETE CASCADE,
+    band          INTEGER NOT NULL,
+    bucket        BIGINT  NOT NULL,
+    "Task_id"     INTEGER NOT NULL REFERENCES "Task" (id) ON DELETE CASCADE,
+    PRIMARY KEY ("Solution_id", band)
+);
+
+CREATE INDEX "ix_SolutionBucket_bucket" ON "SolutionBucket" ("Task_id", band, bucket);
+
+CREATE TABLE "GradingJob"
+(
+    id            VARCHAR(32) PRIMARY KEY,
+    status        VARCHAR(16) NOT NULL DEFAULT 'queued',
+    result        TEXT,
+    error         TEXT,
+    attempts      INTEGER     NOT NULL DEFAULT 0,
+    worker        VARCHAR(128),
+    created_at    TIMESTAMP   NOT NULL DEFAULT now(),
+    started_at    TIMESTAMP,
+    finished_at   TIMESTAMP,
+    "User_id"     INTEGER     NOT NULL REFERENCES "User" (id) ON DELETE CASCADE,
+    "Task_id"     INTEGER     NOT NULL REFERENCES "Task" (id) ON DELETE CASCADE,
+    "Solution_id" INTEGER     NOT NULL REFERENCES "Solution" (id) ON DELETE CASCADE
+);
+
+-- Воркеры выбирают самое старое задание в очереди
+CREATE INDEX "ix_GradingJob_queued" ON "GradingJob" (created_at) WHERE status = 'queued';
+-- Поиск незавершенного задания по решению для объединения повторных запросов
+CREATE INDEX "ix_GradingJob_active_solution" ON "GradingJob" ("Solution_id") WHERE status IN ('queued', 'running');
+
+-- Схема выше уже содержит все миграции из app/init-scripts/migrations (см. app/db/migrate.py)
+CREATE TABLE schema_migrations
+(
+    version    VARCHAR(128) PRIMARY KEY,
+    applied_at TIMESTAMP    NOT NULL DEFAULT now()
+);
+
+INSERT INTO schema_migrations (version)
+VALUES ('0000_baseline_schema'),
+       ('0001_solution_code'),
+       ('0002_query_indexes');
+
 INSERT INTO "Faculty" (name)
 VALUES ('Информационные системы и технологии'),
        ('Вычислительная техника и программное обеспечение');
@@ -182,7 +267,11 @@ VALUES ('1 2 3', '0 2', 1),
        ('55 56 57', '54 110', 1),
        ('58 59 60', '57 116', 1);
 
--- Добавление решений
-INSERT INTO "Solution" (code, "User_id", "Task_id")
-VALUES ('print(''Hello, World!'')', 1, 1),
-       ('print(''Hello, World!'')', 1, 3);
\ No newline at end of file
+-- Добавление решений (код хранится без сжатия, приложение читает оба варианта)
+INSERT INTO "SolutionCode" (hash, data, compression, size)
+VALUES (encode(sha256(convert_to('print(''Hello, World!'')', 'UTF8')), 'hex'),
+        convert_to('print(''Hello, World!'')', 'UTF8'), 'none', 22);
+
+INSERT INTO "Solution" (code_hash, "User_id", "Task_id")
+VALUES (encode(sha256(convert_to('print(''Hello, World!'')', 'UTF8')), 'hex'), 1, 1),
+       (encode(sha256(convert_to('print(''Hello, World!'')', 'UTF8')), 'hex'), 1, 3);
\ No newline at end of file
@@ -0,0 +1,51 @@
+-- Схема, добавленная до появления миграций: лимиты задач, тесты с данными в файлах,
+-- поиск похожих решений и очередь проверки в PostgreSQL.
+-- Все изменения идемпотентны: БД, где они уже есть, не меняется.
+
+ALTER TABLE "Task" ADD COLUMN IF NOT EXISTS time_limit INTEGER;
+ALTER TABLE "Task" ADD COLUMN IF NOT EXISTS memory_limit INTEGER;
+ALTER TABLE "Task" ADD COLUMN IF NOT EXISTS output_limit INTEGER;
+
+ALTER TABLE "TestCase" ADD COLUMN IF NOT EXISTS inp_path VARCHAR(512);
+ALTER TABLE "TestCase" ADD COLUMN IF NOT EXISTS out_path VARCHAR(512);
+
+-- MinHash-сигнатуры решений и LSH-корзины для поиска похожих решений
+CREATE TABLE IF NOT EXISTS "SolutionSignature"
+(
+    "Solution_id" INTEGER PRIMARY KEY REFERENCES "Solution" (id) ON DELETE CASCADE,
+    "Task_id"     INTEGER NOT NULL REFERENCES "Task" (id) ON DELETE CASCADE,
+    signature     BYTEA   NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS "SolutionBucket"
+(
+    "Solution_id" INTEGER NOT NULL REFERENCES "Solution" (id) ON DELETE CASCADE,
+    band          INTEGER NOT NULL,
+    bucket        BIGINT  NOT NULL,
+    "Task_id"     INTEGER NOT NULL REFERENCES "Task" (id) ON DELETE CASCADE,
+    PRIMARY KEY ("Solution_id", band)
+);
+
+CREATE INDEX IF NOT EXISTS "ix_SolutionBucket_bucket" ON "SolutionBucket" ("Task_id", band, bucket);
+
+CREATE TABLE IF NOT EXISTS "GradingJob"
+(
+    id            VARCHAR(32) PRIMARY KEY,
+    status        VARCHAR(16) NOT NULL DEFAULT 'queued',
+    result        TEXT,
+    error         TEXT,
+    attempts      INTEGER     NOT NULL DEFAULT 0,
+    worker        VARCHAR(128),
+    created_at    TIMESTAMP   NOT NULL DEFAULT now(),
+    started_at    TIMESTAMP,
+    finished_at   TIMESTAMP,
+    "User_id"     INTEGER     NOT NULL REFERENCES "User" (id) ON DELETE CASCADE,
+    "Task_id"     INTEGER     NOT NULL REFERENCES "Task" (id) ON DELETE CASCADE,
+    "Solution_id" INTEGER     NOT NULL REFERENCES "Solution" (id) ON DELETE CASCADE
+);
+
+-- Воркеры выбирают самое старое задание в очереди
+CREATE INDEX IF NOT EXISTS "ix_GradingJob_queued" ON "GradingJob" (created_at) WHERE status = 'queued';
+-- Поиск незавершенного задания по решению для объединения повторных запросов
+CREATE INDEX IF NOT EXISTS "ix_GradingJob_active_solution" ON "GradingJob" ("Solution_id")
+    WHERE status IN ('queued', 'running');
@@ -0,0 +1,35 @@
+-- Перенос кода решений из Solution.code в таблицу SolutionCode.
+-- Код переносится без сжатия (compression = 'none'), новые решения приложение сохраняет сжатыми.
+-- БД, созданная из init.sql с таблицей SolutionCode, не изменяется.
+CREATE TABLE IF NOT EXISTS "SolutionCode"
+(
+    hash        VARCHAR(64) PRIMARY KEY,
+    data        BYTEA       NOT NULL,
+    compression VARCHAR(8)  NOT NULL DEFAULT 'zlib',
+    size        INTEGER     NOT NULL
+);
+
+DO
+$$
+    BEGIN
+        IF EXISTS (SELECT 1
+                   FROM information_schema.columns
+                   WHERE table_name = 'Solution'
+                     AND column_name = 'code') THEN
+            INSERT INTO "SolutionCode" (hash, data, compression, size)
+            SELECT DISTINCT encode(sha256(convert_to(code, 'UTF8')), 'hex'),
+                            convert_to(code, 'UTF8'),
+                            'none',
+                            octet_length(convert_to(code, 'UTF8'))
+            FROM "Solution"
+            ON CONFLICT DO NOTHING;
+
+            ALTER TABLE "Solution" ADD COLUMN code_hash VARCHAR(64) REFERENCES "SolutionCode" (hash);
+            UPDATE "Solution" SET code_hash = encode(sha256(convert_to(code, 'UTF8')), 'hex');
+            ALTER TABLE "Solution" ALTER COLUMN code_hash SET NOT NULL;
+            ALTER TABLE "Solution" DROP COLUMN code;
+        END IF;
+    END
+$$;
+
+CREATE INDEX IF NOT EXISTS "ix_Solution_code_hash" ON "Solution" (code_hash);
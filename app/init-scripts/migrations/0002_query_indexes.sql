@@ -0,0 +1,14 @@
+-- Индексы для частых запросов (проверить использование: app/testing_pyfiles/benchmarks/explain.py)
+
+-- Решения пользователя по задаче и последнее решение (ORDER BY id DESC LIMIT 1)
+CREATE INDEX IF NOT EXISTS "ix_Solution_user_task" ON "Solution" ("User_id", "Task_id", id DESC);
+-- Проверка, сдана ли задача: в индекс попадают только успешные решения
+CREATE INDEX IF NOT EXISTS "ix_Solution_success" ON "Solution" ("User_id", "Task_id") WHERE status = 'Success';
+-- Лабораторные работы предмета, в том числе с фильтром по статусу
+CREATE INDEX IF NOT EXISTS "ix_Task_subject_status" ON "Task" ("Subject_id", status);
+-- Студенты группы
+CREATE INDEX IF NOT EXISTS "ix_User_studyGroup" ON "User" ("studyGroup");
+-- Тесты задачи
+CREATE INDEX IF NOT EXISTS "ix_TestCase_Task_id" ON "TestCase" ("Task_id");
+-- Группы факультета
+CREATE INDEX IF NOT EXISTS "ix_Group_faculty" ON "Group" (faculty);
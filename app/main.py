@@ -3,6 +3,7 @@ from fastapi import FastAPI
 from app.config.config import init_config
 from fastapi.middleware.cors import CORSMiddleware
 from app.middleware.auth import auth_middleware
+from app.middleware.timing import timing_middleware
 from app.routers import router as app_router
 
 app = FastAPI(title="SDO API", description="API for SDO", version="0.1.0")
@@ -18,6 +19,7 @@ app.add_middleware(
 def main():
     app.include_router(app_router)
     app.middleware("http")(auth_middleware)
+    app.middleware("http")(timing_middleware)
 
     cfg = init_config()
 
@@ -0,0 +1,24 @@
+import time
+
+from fastapi import Request
+
+from app.config.config import init_config
+from app.core.timing import ENABLED, server_timing, start_request
+
+cfg = init_config()['timing']
+
+
+async def timing_middleware(request: Request, call_next):
+    if not ENABLED:
+        return await call_next(request)
+
+    # Этапы, замеренные при обработке запроса, накапливаются в timings
+    start = time.perf_counter()
+    timings = start_request()
+    response = await call_next(request)
+
+    # Отладочный заголовок с длительностями этапов, виден в devtools браузера
+    if cfg['debug_header'] and timings:
+        timings["total"] = time.perf_counter() - start
+        response.headers["Server-Timing"] = server_timing(timings)
+    return response
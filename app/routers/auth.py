@@ -6,7 +6,8 @@ from http import HTTPStatus
 
 from app.config.config import init_config
 from app.core.jwt_handler import create_access_token
-from app.db.user_methods import add_user, validate_user
+from app.db.async_methods import validate_user
+from app.db.user_methods import add_user
 from app.schemas.auth import LoginRequest, LoginResponse, RegisterRequest, RegisterResponse
 
 router = APIRouter()
@@ -15,7 +16,7 @@ cfg = init_config()['jwt']
 
 @router.post("/login", response_model=LoginResponse, summary="Авторизация пользователя")
 async def login(request: LoginRequest):
-    user_data = validate_user(
+    user_data = await validate_user(
         username=request.username,
         password=request.password
     )
@@ -37,7 +38,7 @@ async def login(request: LoginRequest):
 
 @router.post("/register", response_model=RegisterResponse, summary="Регистрация пользователя")
 async def register(request: RegisterRequest):
-    user_data = validate_user(
+    user_data = await validate_user(
         username=request.username,
         password=request.password
     )
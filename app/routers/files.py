@@ -1,20 +1,25 @@
+import asyncio
+import json
 from typing import Union
 
 from fastapi import APIRouter, Header, UploadFile, File, Depends
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 from http import HTTPStatus
 
 from app.core.check_auth import check_auth
+from app.core.timing import stage
 from app.core.files.files import check_type
-from app.db.subject_methods import get_subject_id_by_task
-from app.db.task_methods import add_solution, delete_solution_bd, get_latest_solution, get_task_data, get_user_solutions_by_task, update_solution_hidden
-from app.db.user_methods import is_user_enrolled_in_subject
+from app.db.async_methods import add_solution, get_latest_solution, get_task_data, is_user_enrolled_in_subject
+from app.db.task_methods import delete_solution_bd, get_user_solutions_by_task, update_solution_hidden
 from app.schemas.files import ResponseUpload
 from app.schemas.others import Error
 from app.schemas.task import TaskInfo, SolutionInfo
-from app.schemas.test import ResponseTest
-from app.testing_pyfiles.test import check_file
-from app.utils.utils import response_with_json
+from app.schemas.test import ResponseTest, GradingJobResponse
+from app.schemas.tests import TestCaseEvent
+from app.testing_pyfiles.jobs import GradingJob, MAX_WAIT, QueueFull, job_queue
+from app.testing_pyfiles.plan import GradingPlan, plan_cache
+from app.testing_pyfiles.test import EventCallback
+from app.utils.utils import response_with_json, response_with_error
 
 router = APIRouter()
 
@@ -37,7 +42,7 @@ async def upload_solution(task_id: int, authorization: str = Header(...), file:
     file_content = await file.read()
 
     # Добавление решения в БД
-    res_add_solution = add_solution(
+    res_add_solution = await add_solution(
         code=file_content.decode('utf-8'),
         user_id=check_data['user_id'],
         task_id=task_id,
@@ -58,62 +63,88 @@ async def upload_solution(task_id: int, authorization: str = Header(...), file:
     )
 
 
-# Тестирование файла
-@router.post("/test/{task_id}", response_model=ResponseTest, summary="Тестирование лабораторной работы")
-async def test_solution(task_id: int, authorization: str = Header(...)):
-    check_data = check_auth(authorization)
-    if isinstance(check_data, JSONResponse):
-        return check_data
-
-    # Проверка, что пользователь принадлежит предмету, к которому относится задача
-    subject_id = get_subject_id_by_task(task_id)
-    if not subject_id:
+async def prepare_grading(task_id: int, check_data: dict) -> Union[tuple[GradingPlan, object], JSONResponse]:
+    """
+    Проверяет доступ пользователя к задаче и возвращает план проверки задачи и последнее решение пользователя.
+    """
+    # План проверки берется из кэша, данные задачи при этом из БД не запрашиваются
+    with stage("plan"):
+        plan = plan_cache.get(task_id)
+    if not plan:
         return JSONResponse(
             status_code=HTTPStatus.NOT_FOUND,
             content={"error": "Task not found."}
         )
 
-    user_enrolled = is_user_enrolled_in_subject(check_data['username'], subject_id)
+    # Проверка, что пользователь принадлежит предмету, к которому относится задача
+    with stage("db_enrolled"):
+        user_enrolled = await is_user_enrolled_in_subject(check_data['username'], plan.subject_id)
     if not user_enrolled:
         return JSONResponse(
             status_code=HTTPStatus.FORBIDDEN,
             content={"error": "User is not enrolled in the subject."}
         )
 
-    # Получение данных задачи
-    task_data = get_task_data(task_id)
-    if not task_data:
-        return JSONResponse(
-            status_code=HTTPStatus.NOT_FOUND,
-            content={"error": "Task data not found."}
-        )
-
     # Получение последнего решения пользователя
-    latest_solution = get_latest_solution(check_data['user_id'], task_id)
+    with stage("db_latest_solution"):
+        latest_solution = await get_latest_solution(check_data['user_id'], task_id)
     if not latest_solution:
         return JSONResponse(
             status_code=HTTPStatus.NOT_FOUND,
             content={"error": "Solution not found."}
         )
 
-    # Выполнение тестирования
-    res_check = await check_file(
-        task_id,
-        task_data['teacher_formula'],
-        task_data['input_variables'],
-        latest_solution.code,
-        latest_solution.id
+    return plan, latest_solution
+
+
+async def submit_grading_job(task_id: int, check_data: dict, plan: GradingPlan, latest_solution,
+                             on_event: EventCallback | None = None) -> GradingJob:
+    job = GradingJob(check_data['user_id'], task_id)
+    return await job_queue.submit(job, plan, latest_solution.code, latest_solution.id, on_event)
+
+
+def queue_full_response(error: QueueFull) -> JSONResponse:
+    """
+    Быстрый отказ при заполненной очереди проверки: клиент повторяет запрос через Retry-After секунд.
+    """
+    return response_with_error(
+        HTTPStatus.TOO_MANY_REQUESTS,
+        str(error),
+        headers={"Retry-After": str(error.retry_after)}
     )
 
-    response = ResponseTest(
-        status=res_check.execution_status,
-        formulas_output=res_check.formulas_output,
-        code_output=res_check.code_output,
-        execution_time=res_check.execution_time,
-        code_length=res_check.code_length,
-    ).model_dump()
 
-    if res_check.execution_status == "Failed":
+def sse_message(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+# Тестирование файла
+@router.post("/test/{task_id}", response_model=ResponseTest, summary="Тестирование лабораторной работы")
+async def test_solution(task_id: int, authorization: str = Header(...)):
+    check_data = check_auth(authorization)
+    if isinstance(check_data, JSONResponse):
+        return check_data
+
+    prepared = await prepare_grading(task_id, check_data)
+    if isinstance(prepared, JSONResponse):
+        return prepared
+    plan, latest_solution = prepared
+
+    # Выполнение тестирования через общую очередь проверки
+    try:
+        job = await submit_grading_job(task_id, check_data, plan, latest_solution)
+    except QueueFull as e:
+        return queue_full_response(e)
+    await job_queue.wait(job, None)
+    if job.status == "error":
+        return response_with_error(
+            HTTPStatus.INTERNAL_SERVER_ERROR,
+            job.error
+        )
+
+    response = job.result.model_dump()
+
+    if job.result.status == "Failed":
         return response_with_json(
             HTTPStatus.BAD_REQUEST,
             response
@@ -125,6 +156,99 @@ async def test_solution(task_id: int, authorization: str = Header(...)):
     )
 
 
+# Постановка решения в очередь на тестирование, результат получается через /test/jobs/{job_id}
+@router.post("/test/{task_id}/jobs", response_model=GradingJobResponse, status_code=HTTPStatus.ACCEPTED,
+             summary="Асинхронное тестирование лабораторной работы")
+async def submit_test_job(task_id: int, authorization: str = Header(...)):
+    check_data = check_auth(authorization)
+    if isinstance(check_data, JSONResponse):
+        return check_data
+
+    prepared = await prepare_grading(task_id, check_data)
+    if isinstance(prepared, JSONResponse):
+        return prepared
+    plan, latest_solution = prepared
+
+    try:
+        job = await submit_grading_job(task_id, check_data, plan, latest_solution)
+    except QueueFull as e:
+        return queue_full_response(e)
+
+    return response_with_json(
+        HTTPStatus.ACCEPTED,
+        job.to_response().model_dump()
+    )
+
+
+# Тестирование с потоковой передачей хода проверки (Server-Sent Events):
+# события started/passed/failed по каждому тесту и итоговое событие result
+@router.post("/test/{task_id}/stream", summary="Тестирование лабораторной работы с ходом проверки по тестам")
+async def stream_test_solution(task_id: int, authorization: str = Header(...)):
+    check_data = check_auth(authorization)
+    if isinstance(check_data, JSONResponse):
+        return check_data
+
+    prepared = await prepare_grading(task_id, check_data)
+    if isinstance(prepared, JSONResponse):
+        return prepared
+    plan, latest_solution = prepared
+
+    events: asyncio.Queue[TestCaseEvent] = asyncio.Queue()
+    try:
+        job = await submit_grading_job(task_id, check_data, plan, latest_solution, on_event=events.put)
+    except QueueFull as e:
+        return queue_full_response(e)
+
+    async def event_stream():
+        finished = asyncio.create_task(job_queue.wait(job, None))
+        try:
+            while True:
+                next_event = asyncio.create_task(events.get())
+                await asyncio.wait({next_event, finished}, return_when=asyncio.FIRST_COMPLETED)
+                if next_event.done():
+                    event = next_event.result()
+                    yield sse_message(event.event, event.model_dump(exclude_none=True))
+                    continue
+                next_event.cancel()
+                # События, пришедшие одновременно с завершением задания
+                while not events.empty():
+                    event = events.get_nowait()
+                    yield sse_message(event.event, event.model_dump(exclude_none=True))
+                yield sse_message("result", job.to_response().model_dump())
+                return
+        finally:
+            finished.cancel()
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+# Статус задания на тестирование, wait > 0 - ожидание завершения до wait секунд (long-poll)
+@router.get("/test/jobs/{job_id}", response_model=GradingJobResponse, summary="Статус задания на тестирование")
+async def get_test_job(job_id: str, wait: float = 0, authorization: str = Header(...)):
+    check_data = check_auth(authorization)
+    if isinstance(check_data, JSONResponse):
+        return check_data
+
+    job = await job_queue.get(job_id)
+    if not job or job.user_id != check_data['user_id']:
+        return JSONResponse(
+            status_code=HTTPStatus.NOT_FOUND,
+            content={"error": "Job not found."}
+        )
+
+    if wait > 0:
+        await job_queue.wait(job, min(wait, MAX_WAIT))
+
+    return response_with_json(
+        HTTPStatus.OK,
+        job.to_response().model_dump()
+    )
+
+
 # Получение информации о задаче по task_id и информация о том, сдал ли пользователь
 # хотя бы одно правильное решение
 @router.get("/task/{task_id}", response_model=Union[TaskInfo, Error],
@@ -135,7 +259,7 @@ async def get_task_info(task_id: int, authorization: str = Header(...)):
         return check_data
 
     # Получение данных задачи
-    task_data = get_task_data(task_id)
+    task_data = await get_task_data(task_id)
     if not task_data:
         return JSONResponse(
             status_code=HTTPStatus.NOT_FOUND,
@@ -1,7 +1,9 @@
 from http import HTTPStatus
 
 from fastapi import APIRouter
-from starlette.responses import JSONResponse
+from starlette.responses import JSONResponse, PlainTextResponse
+
+from app.core.metrics import registry
 
 from app.db.group_methods import get_groups as get_groups_db
 
@@ -14,4 +16,10 @@ async def get_groups():
     return JSONResponse(
         status_code=HTTPStatus.OK,
         content=groups
-    )
\ No newline at end of file
+    )
+
+
+# Метрики в текстовом формате Prometheus
+@router.get("/metrics", response_class=PlainTextResponse, summary="Метрики приложения", include_in_schema=False)
+async def get_metrics():
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
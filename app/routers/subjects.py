@@ -5,8 +5,8 @@ from http import HTTPStatus
 from app.core.check_auth import check_auth
 
 from app.db.student_methods import get_student_tasks_with_status
-from app.db.task_methods import get_tasks_by_subject, get_user_solutions_by_task
-from app.db.user_methods import get_user_subjects, is_user_enrolled_in_subject
+from app.db.task_methods import get_subject_tasks_with_status
+from app.db.async_methods import get_user_subjects, is_user_enrolled_in_subject
 from app.schemas.others import Error
 from app.schemas.subject import SubjectInfo
 from app.schemas.task import Task
@@ -21,7 +21,7 @@ async def get_subjects(authorization: str = Header(...)) -> JSONResponse:
     if isinstance(check_data, JSONResponse):
         return check_data
 
-    user_subjects = get_user_subjects(check_data['username'])
+    user_subjects = await get_user_subjects(check_data['username'])
 
     serialized_subjects = [subject.model_dump() for subject in user_subjects]
 
@@ -37,7 +37,7 @@ async def get_tasks(subject_id: str, authorization: str = Header(...)) -> JSONRe
     check_data = check_auth(authorization)
     if isinstance(check_data, JSONResponse):
         return check_data
-    user_subjects = is_user_enrolled_in_subject(check_data['username'], subject_id)
+    user_subjects = await is_user_enrolled_in_subject(check_data['username'], subject_id)
 
     # Если пользователь не прикреплен к дисциплине или дисциплина не найдена
     if isinstance(user_subjects, str):
@@ -46,27 +46,15 @@ async def get_tasks(subject_id: str, authorization: str = Header(...)) -> JSONRe
             content={"error": user_subjects}
         )
 
-    # Получение решений пользователя для задачи
-    user_solutions = get_tasks_by_subject(subject_id)
-    if not user_solutions:
+    # Задачи предмета со статусом "Success", если у пользователя есть хотя бы одно успешное решение
+    subject_tasks = get_subject_tasks_with_status(subject_id, check_data['user_id'])
+    if not subject_tasks:
         return JSONResponse(
             status_code=HTTPStatus.NOT_FOUND,
             content=Error(message="No solutions found for this task.").model_dump()
         )
 
-    # Проверка, есть ли хотя бы одно успешное решение
-    subject_tasks = get_tasks_by_subject(subject_id)
-
-    serialized_tasks = []
-    print(subject_tasks)
-    for task in subject_tasks:
-        print(task)
-        user_solutions = get_user_solutions_by_task(check_data['user_id'], task.id)
-
-        passed_solutions = [sol for sol in user_solutions if sol.status == "Success"]
-        status = "Success" if passed_solutions else "Failed"
-        task.status = status
-        serialized_tasks.append(task.model_dump())
+    serialized_tasks = [task.model_dump() for task in subject_tasks]
 
     return JSONResponse(
         status_code=HTTPStatus.OK,
@@ -1,21 +1,36 @@
-from fastapi import APIRouter, Depends, HTTPException, Header, Request
+import asyncio
+import contextlib
+import os
+import shutil
+import time
+import uuid
+
+from fastapi import APIRouter, Depends, HTTPException, Header, Request, UploadFile, File
 from fastapi.responses import JSONResponse
 from http import HTTPStatus
 from typing import List
 
+from app.core.files.files import check_type, save_upload
 from app.core.jwt_handler import decode_access_token
 from app.db.student_methods import get_groups_by_faculty, get_student_labs, get_student_labs_by_subject, \
     get_users_by_faculty, get_users_by_group
 from app.db.teacher_methods import get_teacher_subjects, get_students_data, create_laboratory, get_laboratories, \
-    delete_laboratory, toggle_laboratory_status, get_student_tasks_with_status, get_lab_details, edit_lab, get_laboratoy_with_status
-from app.db.user_methods import get_groups_by_user_id, get_username_by_id, is_user_enrolled_in_subject
+    delete_laboratory, toggle_laboratory_status, add_file_test_case, get_student_tasks_with_status, get_lab_details, edit_lab, get_laboratoy_with_status
+from app.db.similarity_methods import find_similar_pairs, find_similar_solutions
+from app.db.async_methods import is_user_enrolled_in_subject
+from app.db.user_methods import get_groups_by_user_id, get_username_by_id
 from app.schemas.teachers import (
     StudentResponse,
     GroupResponse,
     LabResponse,
-    LabDetailResponse, CreateLabRequest, UpdateLabRequest, DetailLab
+    LabDetailResponse, CreateLabRequest, UpdateLabRequest, DetailLab, SimilarSolution, SimilarPair
 )
+from app.schemas.test import FullTestReport, RegradeJobResponse
 from app.schemas.users import FullUserInfo
+from app.testing_pyfiles.plan import plan_cache, test_data_path
+from app.testing_pyfiles.regrade import regrade_manager
+from app.testing_pyfiles.formulas import check_formulas
+from app.testing_pyfiles.test import run_all_tests
 from app.utils.utils import response_with_json, response_with_error
 
 router = APIRouter(prefix="/api/teachers")
@@ -97,7 +112,7 @@ async def get_student_lab_detail(student_id: int, lab_id: int):
             summary="Получение лабораторных работ студента")
 async def get_student_tasks(student_id: int, subject_id: int):
     student_username = get_username_by_id(student_id)
-    is_enrolled = is_user_enrolled_in_subject(student_username, subject_id)
+    is_enrolled = await is_user_enrolled_in_subject(student_username, subject_id)
     if isinstance(is_enrolled, str):
         return response_with_error(
             HTTPStatus.NOT_FOUND,
@@ -229,6 +244,9 @@ async def get_labs_unpublished():
 @router.delete("/labs/{lab_id}", summary="Удаление лабораторной работы")
 async def delete_lab(lab_id: int):
     result = delete_laboratory(lab_id)
+    plan_cache.invalidate(lab_id)
+    if result:
+        shutil.rmtree(test_data_path(str(lab_id)), ignore_errors=True)
     if not result:
         return response_with_error(
             HTTPStatus.NOT_FOUND,
@@ -244,6 +262,7 @@ async def delete_lab(lab_id: int):
 @router.put("/labs/{lab_id}/toggle", summary="Опубликование лабораторной работы")
 async def toggle_status_lab(lab_id: int):
     result = toggle_laboratory_status(lab_id)
+    plan_cache.invalidate(lab_id)
     if not result:
         return response_with_error(
             HTTPStatus.NOT_FOUND,
@@ -258,17 +277,163 @@ async def toggle_status_lab(lab_id: int):
 @router.put("/labs/{lab_id}", response_model=UpdateLabRequest, summary="Редактирование лабораторной работы")
 async def edit_lab_endpoint(lab_id: int, lab: UpdateLabRequest):
    
-    task_to_update = edit_lab(lab_id, lab)
-    if not task_to_update:
+    removed_paths = edit_lab(lab_id, lab)
+    plan_cache.invalidate(lab_id)
+    if removed_paths is None:
         return response_with_error(
             HTTPStatus.INTERNAL_SERVER_ERROR,
             "Ошибка редактирования лабораторной работы"
         )
+    # Файлы тестов, удаленных при редактировании
+    for path in removed_paths:
+        with contextlib.suppress(OSError):
+            os.remove(test_data_path(path))
     return JSONResponse(
         status_code=HTTPStatus.OK,
         content={"id": lab_id}
     )
 
+# Добавление теста с данными в файлах
+@router.post("/labs/{lab_id}/test-cases/files", summary="Добавление теста с большими входными и выходными данными")
+async def add_lab_file_test_case(lab_id: int, input_file: UploadFile = File(...), output_file: UploadFile = File(...)):
+    # Файлы сохраняются под случайными именами в каталоге лабораторной работы, в БД записываются относительные пути
+    name = uuid.uuid4().hex
+    inp_path, out_path = f"{lab_id}/{name}.in", f"{lab_id}/{name}.out"
+    directory = test_data_path(str(lab_id))
+    await asyncio.to_thread(save_upload, directory, os.path.basename(inp_path), input_file)
+    await asyncio.to_thread(save_upload, directory, os.path.basename(out_path), output_file)
+
+    try:
+        test_case_id = add_file_test_case(lab_id, inp_path, out_path)
+        error = None if test_case_id is not None else (HTTPStatus.NOT_FOUND, "Лабораторная работа не найдена")
+    except Exception:
+        error = (HTTPStatus.INTERNAL_SERVER_ERROR, "Ошибка добавления тест-кейса")
+    if error:
+        # Удаляются только что сохраненные файлы, файлы других тестов лабораторной остаются
+        for path in (inp_path, out_path):
+            with contextlib.suppress(OSError):
+                os.remove(test_data_path(path))
+        return response_with_error(*error)
+
+    plan_cache.invalidate(lab_id)
+    return JSONResponse(
+        status_code=HTTPStatus.CREATED,
+        content={"id": test_case_id, "inp_path": inp_path, "out_path": out_path}
+    )
+
+
+# Прогон решения на всех тестах лабораторной работы
+@router.post("/labs/{lab_id}/check", response_model=FullTestReport,
+             summary="Проверка решения на всех тестах лабораторной работы с отчетом по каждому тесту")
+async def check_lab_solution(lab_id: int, file: UploadFile = File(...)):
+    plan = plan_cache.get(lab_id)
+    if not plan:
+        return response_with_error(
+            HTTPStatus.NOT_FOUND,
+            "Лабораторная работа не найдена"
+        )
+
+    is_valid, error = check_type(file)
+    if not is_valid:
+        return response_with_error(
+            HTTPStatus.BAD_REQUEST,
+            error
+        )
+
+    code = (await file.read()).decode('utf-8')
+
+    # В отличие от /test, тесты не прерываются на первой ошибке, а статус решений в БД не меняется
+    start_time = time.perf_counter()
+    formulas_output, formulas_correct = await check_formulas(plan.formulas, code)
+    reports = await run_all_tests(plan.test_cases, code, plan.limits)
+    execution_time = time.perf_counter() - start_time
+
+    passed = sum(report.passed for report in reports)
+    response = FullTestReport(
+        status="Success" if reports and passed == len(reports) else "Failed",
+        formulas_output=formulas_output,
+        formulas_correct=formulas_correct,
+        passed=passed,
+        total=len(reports),
+        execution_time=round(execution_time, 3),
+        test_cases=reports
+    ).model_dump()
+
+    return JSONResponse(
+        status_code=HTTPStatus.OK,
+        content=response
+    )
+
+# Перепроверка последних решений всех студентов после изменения тестов лабораторной работы
+@router.post("/labs/{lab_id}/regrade", response_model=RegradeJobResponse, status_code=HTTPStatus.ACCEPTED,
+             summary="Перепроверка решений лабораторной работы")
+async def regrade_lab(lab_id: int):
+    if not plan_cache.get(lab_id):
+        return response_with_error(
+            HTTPStatus.NOT_FOUND,
+            "Лабораторная работа не найдена"
+        )
+
+    job = regrade_manager.start(lab_id)
+    return JSONResponse(
+        status_code=HTTPStatus.ACCEPTED,
+        content=job.to_response().model_dump()
+    )
+
+
+# Прогресс перепроверки решений лабораторной работы
+@router.get("/labs/{lab_id}/regrade/{job_id}", response_model=RegradeJobResponse,
+            summary="Прогресс перепроверки решений лабораторной работы")
+async def get_regrade_progress(lab_id: int, job_id: str):
+    job = regrade_manager.get(job_id)
+    if not job or job.task_id != lab_id:
+        return response_with_error(
+            HTTPStatus.NOT_FOUND,
+            "Перепроверка не найдена"
+        )
+
+    return JSONResponse(
+        status_code=HTTPStatus.OK,
+        content=job.to_response().model_dump()
+    )
+
+
+# Пары похожих решений лабораторной работы (последние решения студентов)
+@router.get("/labs/{lab_id}/similar", response_model=list[SimilarPair],
+            summary="Поиск похожих решений лабораторной работы")
+async def get_similar_lab_solutions(lab_id: int, threshold: float = 0.8, limit: int = 100):
+    if not plan_cache.get(lab_id):
+        return response_with_error(
+            HTTPStatus.NOT_FOUND,
+            "Лабораторная работа не найдена"
+        )
+
+    # Решения индексируются при добавлении, ранее загруженные - командой python -m app.db.similarity_methods
+    pairs = await asyncio.to_thread(find_similar_pairs, lab_id, threshold, limit)
+
+    return JSONResponse(
+        status_code=HTTPStatus.OK,
+        content=[SimilarPair(**pair).model_dump() for pair in pairs]
+    )
+
+
+# Решения других студентов, похожие на данное решение
+@router.get("/solutions/{solution_id}/similar", response_model=list[SimilarSolution],
+            summary="Поиск решений, похожих на решение студента")
+async def get_similar_solutions(solution_id: int, threshold: float = 0.5, limit: int = 20):
+    similar = await asyncio.to_thread(find_similar_solutions, solution_id, threshold, limit)
+    if similar is None:
+        return response_with_error(
+            HTTPStatus.NOT_FOUND,
+            "Решение не найдено"
+        )
+
+    return JSONResponse(
+        status_code=HTTPStatus.OK,
+        content=[SimilarSolution(**solution).model_dump() for solution in similar]
+    )
+
+
 # Информация о пользователе
 @router.get("/students/{student_id}/info", summary="Информация о пользователе", response_model=FullUserInfo)
 async def get_students_info(student_id: int):
@@ -315,7 +480,11 @@ async def get_unpublished_task_details(lab_id: int):
         teacher_formula=labs.get("teacher_formula"),
         input_variables=labs.get("input_variables"),
         subject_id=labs.get("subject_id"),
-        test_cases=[{"id": case.get("id"), "inp": case["input"], "out": case["output"]} for case in labs.get("test_cases", [])]
+        time_limit=labs.get("time_limit"),
+        memory_limit=labs.get("memory_limit"),
+        output_limit=labs.get("output_limit"),
+        test_cases=[{"id": case.get("id"), "inp": case["input"], "out": case["output"],
+                     "inp_path": case.get("inp_path"), "out_path": case.get("out_path")} for case in labs.get("test_cases", [])]
 ).model_dump()
 
     return JSONResponse(
@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import Optional, List
 from app.schemas.task import SolutionInfo
 
@@ -39,6 +39,9 @@ class TestCaseSchema(BaseModel):
     id: int
     inp: str
     out: str
+    # Пути к файлам теста с большими данными, задаются через загрузку файлов
+    inp_path: Optional[str] = None
+    out_path: Optional[str] = None
 
     class Config:
         from_attributes = True
@@ -51,6 +54,11 @@ class TaskBaseSchema(BaseModel):
     teacher_formula: Optional[str] = None
     input_variables: Optional[str] = None
     subject_id: int
+    # Лимиты на один тест, None - значения по умолчанию из конфига
+    # Нулевой или отрицательный лимит не принимается: setrlimit в песочнице завершился бы ошибкой
+    time_limit: Optional[int] = Field(None, gt=0)  # Процессорное время, секунды
+    memory_limit: Optional[int] = Field(None, gt=0)  # Память, мегабайты
+    output_limit: Optional[int] = Field(None, gt=0)  # Размер вывода, килобайты
 
     class Config:
         from_attributes = True
@@ -86,4 +94,25 @@ class DetailLab(BaseModel):
     teacher_formula: Optional[str] = None
     input_variables: Optional[str] = None
     subject_id: int
-    test_cases: List[TestCaseSchema]
\ No newline at end of file
+    time_limit: Optional[int] = Field(None, gt=0)
+    memory_limit: Optional[int] = Field(None, gt=0)
+    output_limit: Optional[int] = Field(None, gt=0)
+    test_cases: List[TestCaseSchema]
+
+
+# Похожие решения (поиск списывания)
+class SimilarSolution(BaseModel):
+    solution_id: int
+    user_id: int
+    username: str
+    similarity: float
+
+
+class SimilarPair(BaseModel):
+    first_solution_id: int
+    first_user_id: int
+    first_username: str
+    second_solution_id: int
+    second_user_id: int
+    second_username: str
+    similarity: float
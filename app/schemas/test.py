@@ -1,8 +1,38 @@
 from pydantic import BaseModel
 
+from app.schemas.tests import TestCaseReport
+
 class ResponseTest(BaseModel):
     status: str
     formulas_output: str
     code_output: str
     execution_time: float
-    code_length: int
\ No newline at end of file
+    code_length: int
+    peak_memory_kb: int = 0
+
+class GradingJobResponse(BaseModel):
+    job_id: str
+    status: str
+    result: ResponseTest | None = None
+    error: str | None = None
+
+class FullTestReport(BaseModel):
+    status: str
+    formulas_output: str
+    formulas_correct: bool
+    passed: int
+    total: int
+    execution_time: float  # Реальное время прогона всех тестов, секунды
+    test_cases: list[TestCaseReport]
+
+class RegradeJobResponse(BaseModel):
+    job_id: str
+    task_id: int
+    status: str
+    total: int
+    processed: int
+    succeeded: int
+    failed: int
+    elapsed: float  # Время проверки, секунды
+    solutions_per_sec: float
+    error: str | None = None
@@ -6,3 +6,47 @@ class TestCase(BaseModel):
     execution_time: float
     code_length: int
     execution_status: str
+    peak_memory_kb: int = 0
+
+class ExecutionLimits(BaseModel):
+    wall_time: float  # Реальное время, секунды
+    cpu_time: int  # Процессорное время, секунды
+    memory_mb: int  # Адресное пространство, мегабайты
+    output_kb: int  # Размер вывода, килобайты
+
+class OutputMismatch(BaseModel):
+    token: int  # Номер первого несовпавшего токена
+    line: int  # Строка вывода программы, на которой он находится
+    expected: str
+    actual: str
+
+class ExecutionResult(BaseModel):
+    output: str = ""
+    execution_time: float = 0.0  # Реальное время, секунды
+    cpu_time: float = 0.0  # Процессорное время (user + system), секунды
+    peak_memory_kb: int = 0  # Пиковый размер резидентной памяти
+    timed_out: bool = False
+    output_limit_exceeded: bool = False
+    error: str | None = None
+    passed: bool | None = None  # Результат потокового сравнения с файлом ожидаемого вывода, если он задан
+    mismatch: OutputMismatch | None = None
+
+class TestCaseEvent(BaseModel):
+    event: str  # started, passed, failed, cached
+    test_case_number: int | None = None
+    duration: float | None = None
+    cpu_time: float | None = None
+    peak_memory_kb: int | None = None
+
+class TestCaseReport(BaseModel):
+    test_case_number: int
+    input_data: str
+    expected_output: str
+    user_output: str
+    passed: bool
+    execution_time: float = 0.0
+    cpu_time: float = 0.0
+    peak_memory_kb: int = 0
+    timed_out: bool = False
+    output_limit_exceeded: bool = False
+    mismatch: OutputMismatch | None = None
@@ -0,0 +1,81 @@
+"""
+Микробенчмарк накладных расходов на один тест при проверке решения.
+
+Сравнивает прежнюю схему (подстановка входных данных в исходник и компиляция на каждый тест)
+с компиляцией решения один раз, а также измеряет полный цикл через пул процессов.
+
+Запуск: python -m app.testing_pyfiles.benchmarks.compile_overhead [--cases 60] [--lines 400]
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import time
+
+from app.testing_pyfiles.executor import CompiledCode, execute_async, pool
+
+
+def generate_solution(lines: int) -> str:
+    """
+    Решение типичной формы: чтение входа, цепочка вычислений, вывод.
+    """
+    body = ["inputs = input().split()", "a1, a2, a3 = int(inputs[0]), int(inputs[1]), int(inputs[2])", "b0 = a1"]
+    for i in range(1, lines):
+        body.append(f"b{i} = b{i - 1} + a2 - a3  # шаг {i}")
+    body.append(f"print(b{lines - 1})")
+    return "\n".join(body)
+
+
+def per_case_compile(code_str: str, inputs: list[str]) -> float:
+    start = time.perf_counter()
+    for input_data in inputs:
+        code_with_input = f"import sys\ninput = lambda: '{input_data}'\n{code_str}"
+        with contextlib.redirect_stdout(io.StringIO()):
+            exec(compile(code_with_input, "<string>", "exec"), {})
+    return time.perf_counter() - start
+
+
+def compile_once(code_str: str, inputs: list[str]) -> float:
+    start = time.perf_counter()
+    code = compile(code_str, "solution.py", "exec")
+    for input_data in inputs:
+        with contextlib.redirect_stdout(io.StringIO()):
+            exec(code, {"input": lambda: input_data})
+    return time.perf_counter() - start
+
+
+async def sandbox_run(code_str: str, inputs: list[str]) -> float:
+    start = time.perf_counter()
+    code = CompiledCode(code_str)
+    for input_data in inputs:
+        await execute_async(code, input_data)
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cases", type=int, default=60, help="Количество тестов в задаче")
+    parser.add_argument("--lines", type=int, default=400, help="Количество строк в решении")
+    args = parser.parse_args()
+
+    code_str = generate_solution(args.lines)
+    inputs = [f"{i} {i + 1} {i + 2}" for i in range(args.cases)]
+
+    # Прогрев пула, чтобы не учитывать запуск интерпретаторов
+    asyncio.run(sandbox_run(code_str, inputs[:1]))
+
+    results = {
+        "compile per case (in-process)": per_case_compile(code_str, inputs),
+        "compile once (in-process)": compile_once(code_str, inputs),
+        "compile once (sandbox pool)": asyncio.run(sandbox_run(code_str, inputs)),
+    }
+
+    print(f"{args.cases} test cases, {args.lines} lines of code")
+    for name, total in results.items():
+        print(f"{name:<32} total {total * 1000:9.2f} ms   per case {total / args.cases * 1000:8.3f} ms")
+
+    pool.close()
+
+
+if __name__ == "__main__":
+    main()
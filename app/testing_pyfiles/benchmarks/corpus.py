@@ -0,0 +1,91 @@
+"""
+Генерируемый корпус решений для бенчмарков проверки.
+
+Задача совпадает с примером из test_files: на вход три числа a1 a2 a3,
+нужно вывести b1 = a1 + a2 - a3 и b2 = b1 + a2.
+"""
+from typing import NamedTuple
+
+from app.testing_pyfiles.plan import GradingPlan, PlanTestCase
+
+TEACHER_FORMULA = "b1=a1+a2-a3\nb2=b1+a2"
+INPUT_VARIABLES = "a1\na2\na3"
+
+HEADER = """inputs = input().split()
+a1 = int(inputs[0])
+a2 = int(inputs[1])
+a3 = int(inputs[2])
+"""
+CORRECT_BODY = """b1 = a1 + a2 - a3
+b2 = b1 + a2
+print(b1, b2)
+"""
+
+
+class Submission(NamedTuple):
+    kind: str
+    code: str
+
+
+def correct() -> str:
+    return HEADER + CORRECT_BODY
+
+
+def wrong() -> str:
+    return HEADER + "b1 = a1 + a2 + a3\nb2 = b1 + a2\nprint(b1, b2)\n"
+
+
+def slow() -> str:
+    # Около 0.2 с процессорного времени на тест, ответ верный
+    return HEADER + "s = 0\nfor i in range(3_000_000):\n    s += i\n" + CORRECT_BODY
+
+
+def infinite_loop() -> str:
+    return HEADER + "while True:\n    pass\n"
+
+
+def output_flood() -> str:
+    return HEADER + "while True:\n    print(a1, a2, a3)\n"
+
+
+def huge_source(lines: int = 5000) -> str:
+    body = ["c0 = a1"]
+    for i in range(1, lines):
+        body.append(f"c{i} = (c{i - 1} + a2 - a3) % 1000  # шаг {i}")
+    return HEADER + "\n".join(body) + "\n" + CORRECT_BODY
+
+
+GENERATORS = {
+    "correct": correct,
+    "wrong": wrong,
+    "slow": slow,
+    "infinite_loop": infinite_loop,
+    "output_flood": output_flood,
+    "huge_source": huge_source,
+}
+
+
+def build_corpus(kinds: list[str] | None = None) -> list[Submission]:
+    return [Submission(kind, GENERATORS[kind]()) for kind in (kinds or GENERATORS)]
+
+
+def build_plan(test_cases: int = 10, cpu_time: int = 1, output_kb: int = 256) -> GradingPlan:
+    """
+    План проверки задачи корпуса без обращения к БД.
+    """
+    cases = []
+    for i in range(test_cases):
+        a1, a2, a3 = i, i * 2 + 1, i % 7
+        b1 = a1 + a2 - a3
+        cases.append(PlanTestCase(f"{a1} {a2} {a3}", f"{b1} {b1 + a2}"))
+    task_data = {
+        "id": 0,
+        "subject_id": 0,
+        "status": "published",
+        "teacher_formula": TEACHER_FORMULA,
+        "input_variables": INPUT_VARIABLES,
+        "time_limit": cpu_time,
+        "memory_limit": None,
+        "output_limit": output_kb,
+    }
+    return GradingPlan(task_data, cases)
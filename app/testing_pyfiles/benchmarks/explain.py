@@ -0,0 +1,158 @@
+"""
+Проверка планов частых запросов на большом синтетическом наборе данных.
+
+Во временной схеме создается схема БД из init.sql, заполняется синтетическими данными, после ANALYZE
+для каждого запроса выполняется EXPLAIN и проверяется, что планировщик использует ожидаемый индекс.
+Все выполняется в одной транзакции, которая откатывается, поэтому данные в БД не меняются.
+
+    python -m app.testing_pyfiles.benchmarks.explain [--scale 1.0]
+
+Код возврата 1, если какой-либо запрос выполняется без ожидаемого индекса.
+"""
+import argparse
+import sys
+from pathlib import Path
+
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql
+
+from app.db.db import Group, Solution, Task, TestCase, User, engine
+from app.db.task_methods import tasks_progress_query
+
+INIT_SQL = Path(__file__).resolve().parents[2] / "init-scripts" / "init.sql"
+SCHEMA = "sdo_explain"
+
+# Параметры запросов: значения, для которых в синтетических данных есть записи
+USER_ID, TASK_ID, SUBJECT_ID, GROUP_ID, FACULTY_ID = 1001, 1001, 1001, 1001, 1001
+
+SYNTHETIC_DATA = """
+INSERT INTO "Faculty" (id, name)
+SELECT 1000 + i, 'Факультет ' || i FROM generate_series(1, {faculties}) i;
+
+INSERT INTO "Group" (id, name, faculty)
+SELECT 1000 + i, 'Группа ' || i, 1001 + i % {faculties} FROM generate_series(1, {groups}) i;
+
+INSERT INTO "User" (id, username, password, "studyGroup")
+SELECT 1000 + i, 'student' || i, 'password', 1001 + i % {groups} FROM generate_series(1, {users}) i;
+
+INSERT INTO "Subject" (id, name)
+SELECT 1000 + i, 'Дисциплина ' || i FROM generate_series(1, {subjects}) i;
+
+INSERT INTO "Group_Subject" (group_id, subject_id)
+SELECT DISTINCT 1001 + g % {groups}, 1001 + (g * 7 + s) % {subjects}
+FROM generate_series(0, {groups} - 1) g, generate_series(0, 4) s;
+
+INSERT INTO "Task" (id, name, status, "Subject_id")
+SELECT 1000 + i, 'Лабораторная ' || i, CASE WHEN i % 4 = 0 THEN 'unpublished' ELSE 'published' END,
+       1001 + i % {subjects}
+FROM generate_series(1, {tasks}) i;
+
+INSERT INTO "TestCase" (inp, out, "Task_id")
+SELECT i::text, i::text, 1001 + i % {tasks} FROM generate_series(1, {tasks} * 10) i;
+
+INSERT INTO "SolutionCode" (hash, data, compression, size)
+VALUES (repeat('0', 64), convert_to('print(1)', 'UTF8'), 'none', 8);
+
+INSERT INTO "Solution" (code_hash, is_hidden, status, "User_id", "Task_id")
+SELECT repeat('0', 64), random() < 0.05, CASE WHEN random() < 0.2 THEN 'Success' ELSE 'Failed' END,
+       1001 + (random() * ({users} - 1))::int, 1001 + (random() * ({tasks} - 1))::int
+FROM generate_series(1, {solutions}) i;
+
+-- Решения для параметров запросов
+INSERT INTO "Solution" (code_hash, status, "User_id", "Task_id")
+SELECT repeat('0', 64), 'Failed', {user_id}, {task_id} FROM generate_series(1, 5) i;
+
+ANALYZE;
+"""
+
+
+def _sql(statement) -> str:
+    return str(statement.compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}))
+
+
+# Запросы в том виде, в котором их выполняют методы app/db, и индексы, которые они должны использовать
+QUERIES = [
+    ("latest solution (get_latest_solution)",
+     select(Solution).filter_by(User_id=USER_ID, Task_id=TASK_ID).order_by(Solution.id.desc()).limit(1),
+     {"ix_Solution_user_task"}),
+    ("visible solutions (get_user_solutions_by_task)",
+     select(Solution).filter_by(User_id=USER_ID, Task_id=TASK_ID, is_hidden=False),
+     {"ix_Solution_user_task"}),
+    ("student progress (get_tasks_progress)",
+     tasks_progress_query([USER_ID], published_only=True),
+     {"ix_Solution_success", "ix_Solution_user_task"}),
+    ("published tasks of subject",
+     select(Task).filter(Task.Subject_id == SUBJECT_ID, Task.status == "published"),
+     {"ix_Task_subject_status"}),
+    ("students of group",
+     select(User).filter(User.studyGroup == GROUP_ID),
+     {"ix_User_studyGroup"}),
+    ("test cases of task",
+     select(TestCase).filter(TestCase.Task_id == TASK_ID),
+     {"ix_TestCase_Task_id"}),
+    ("groups of faculty",
+     select(Group).filter(Group.faculty == FACULTY_ID),
+     {"ix_Group_faculty"}),
+]
+
+
+def _plan_nodes(plan: dict):
+    yield plan
+    for child in plan.get("Plans", []):
+        yield from _plan_nodes(child)
+
+
+def used_indexes(cursor, sql: str) -> tuple[set[str], list[str]]:
+    """
+    :return: Имена использованных индексов и типы узлов плана
+    """
+    cursor.execute("EXPLAIN (FORMAT JSON) " + sql)
+    plan = cursor.fetchone()[0][0]["Plan"]
+    nodes = list(_plan_nodes(plan))
+    return {node["Index Name"] for node in nodes if "Index Name" in node}, [node["Node Type"] for node in nodes]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Проверка использования индексов частыми запросами")
+    parser.add_argument("--scale", type=float, default=1.0,
+                        help="Множитель объема данных (1.0 - 50 000 студентов, 500 000 решений)")
+    args = parser.parse_args()
+
+    # На каждое значение фильтра приходятся единицы-десятки строк, как в рабочей БД
+    sizes = {
+        "faculties": max(10, int(500 * args.scale)),
+        "groups": max(100, int(5000 * args.scale)),
+        "users": max(1000, int(50000 * args.scale)),
+        "subjects": max(10, int(1000 * args.scale)),
+        "tasks": max(200, int(20000 * args.scale)),
+        "solutions": max(1000, int(500000 * args.scale)),
+        "user_id": USER_ID,
+        "task_id": TASK_ID,
+    }
+
+    failed = 0
+    connection = engine.raw_connection()
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(f"CREATE SCHEMA {SCHEMA}")
+            cursor.execute(f"SET LOCAL search_path TO {SCHEMA}")
+            cursor.execute(INIT_SQL.read_text(encoding="utf-8"))
+            print(f"Generating data: {sizes['users']} users, {sizes['tasks']} tasks, {sizes['solutions']} solutions")
+            cursor.execute(SYNTHETIC_DATA.format(**sizes))
+
+            for name, statement, expected in QUERIES:
+                indexes, node_types = used_indexes(cursor, _sql(statement))
+                ok = bool(indexes & expected)
+                failed += not ok
+                print(f"{'OK  ' if ok else 'FAIL'} {name:48} {' -> '.join(node_types)} {sorted(indexes)}")
+    finally:
+        connection.rollback()
+        connection.close()
+
+    if failed:
+        print(f"{failed} queries do not use the expected indexes")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
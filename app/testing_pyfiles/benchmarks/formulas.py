@@ -0,0 +1,87 @@
+"""
+Проверка формул студента: регрессия по росту памяти и бенчмарк на больших файлах.
+
+Регрессия: многократный вызов check_formulas не должен накапливать состояние между проверками
+(раньше списки TeacherList.check и TeacherList.input_variables росли с каждым вызовом).
+Бенчмарк: время проверки должно расти линейно с размером решения, решение на 1000 строк - единицы миллисекунд.
+
+Запуск: python -m app.testing_pyfiles.benchmarks.formulas [--calls 500] [--sizes 1000 10000 50000]
+Код возврата 1, если память выросла больше допустимого.
+"""
+import argparse
+import asyncio
+import gc
+import time
+import tracemalloc
+
+from app.testing_pyfiles.formulas import TeacherFormulas, check_formulas
+
+TEACHER_FORMULAS = TeacherFormulas(["b1=a1+a2-a3", "b2=b1+a2", "b3=b2*a3/a1"])
+MAX_GROWTH_KB = 64  # Допустимый рост памяти после прогрева, килобайты
+
+
+def generate_solution(lines: int) -> str:
+    """
+    Решение с вводом, длинной цепочкой промежуточных вычислений и формулами преподавателя в конце.
+    """
+    body = ["a1 = int(input())", "a2 = int(input())", "a3 = int(input())", "c0 = a1"]
+    for i in range(1, lines):
+        # Каждая вторая строка похожа на формулу преподавателя по операторам, но отличается структурой
+        if i % 2:
+            body.append(f"c{i} = c{i - 1} - (a2 + a3)  # шаг {i}")
+        else:
+            body.append(f"c{i} = (c{i - 1} % 7) ** 2  # шаг {i}")
+    body += ["b1 = a1 + a2 - a3", "b2 = b1 + a2", "b3 = b2 * a3 / a1", "print(b1, b2, b3)"]
+    return "\n".join(body)
+
+
+async def memory_growth(calls: int) -> int:
+    code_str = generate_solution(50)
+
+    async def run(count: int) -> tracemalloc.Snapshot:
+        for _ in range(count):
+            await check_formulas(TEACHER_FORMULAS, code_str)
+        gc.collect()
+        return tracemalloc.take_snapshot()
+
+    # Первая серия вызовов после старта tracemalloc прогревает внутренние буферы парсера,
+    # поэтому сравниваются две следующие серии: при отсутствии утечки между ними рост около нуля
+    tracemalloc.start()
+    await run(calls)
+    before = await run(calls)
+    after = await run(calls)
+    tracemalloc.stop()
+
+    return sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+
+
+async def benchmark(sizes: list[int]) -> None:
+    # Большие решения разбираются в процессах подготовки, первый вызов запускает их и в замер не входит
+    await check_formulas(TEACHER_FORMULAS, generate_solution(max(sizes)))
+    for lines in sizes:
+        code_str = generate_solution(lines)
+        start = time.perf_counter()
+        formulas_output, formulas_correct = await check_formulas(TEACHER_FORMULAS, code_str)
+        total = time.perf_counter() - start
+        assert formulas_correct, formulas_output
+        print(f"{lines:>7} lines   total {total * 1000:9.2f} ms   per line {total / lines * 1e6:7.2f} us")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=500, help="Количество проверок для замера памяти")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 50000],
+                        help="Размеры решений в строках")
+    args = parser.parse_args()
+
+    growth = asyncio.run(memory_growth(args.calls))
+    print(f"memory growth after {args.calls} calls: {growth / 1024:.1f} KB (limit {MAX_GROWTH_KB} KB)")
+
+    asyncio.run(benchmark(args.sizes))
+
+    if growth > MAX_GROWTH_KB * 1024:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+"""
+Бенчмарк проверки решений на сгенерированном корпусе (см. corpus.py).
+
+Режимы:
+    check_formulas - только проверка формул
+    run_tests      - запуск тестов в песочнице (fail-fast, как у студентов)
+    check_file     - полная проверка: формулы, тесты, кэш результатов (без записи статуса в БД)
+
+Для каждого режима считаются p50/p95 задержки на одно решение и пропускная способность
+(решений в секунду) при заданной параллельности. Каждое решение в каждом повторе уникально,
+поэтому кэш результатов не влияет на замеры.
+
+Результаты сохраняются в JSON (baselines/<name>.json) и сравниваются с сохраненными ранее:
+
+    python -m app.testing_pyfiles.benchmarks.grading --save default
+    python -m app.testing_pyfiles.benchmarks.grading --compare default [--tolerance 0.2]
+
+При сравнении код возврата 1, если p95 или пропускная способность какого-либо режима
+ухудшились больше чем на tolerance.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import time
+from pathlib import Path
+
+from app.testing_pyfiles.benchmarks.corpus import GENERATORS, build_corpus, build_plan
+from app.testing_pyfiles.cache import result_cache
+from app.testing_pyfiles.executor import WORKERS, pool
+from app.testing_pyfiles.formulas import check_formulas
+from app.testing_pyfiles.plan import GradingPlan
+from app.testing_pyfiles.test import grade_code, run_tests
+
+BASELINES_DIR = Path(__file__).parent / "baselines"
+
+
+async def _check_formulas(plan: GradingPlan, code: str) -> None:
+    await check_formulas(plan.formulas, code)
+
+
+async def _run_tests(plan: GradingPlan, code: str) -> None:
+    await run_tests(plan.test_cases, code, plan.limits)
+
+
+async def _check_file(plan: GradingPlan, code: str) -> None:
+    await grade_code(plan, code)
+
+
+MODES = {
+    "check_formulas": _check_formulas,
+    "run_tests": _run_tests,
+    "check_file": _check_file,
+}
+
+
+def percentile(values: list[float], q: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(q * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def summarize(latencies: list[float]) -> dict:
+    return {
+        "count": len(latencies),
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 3),
+    }
+
+
+async def run_mode(mode: str, plan: GradingPlan, kinds: list[str], repeat: int, concurrency: int) -> dict:
+    func = MODES[mode]
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: dict[str, list[float]] = {kind: [] for kind in kinds}
+
+    async def run_one(kind: str, code: str) -> None:
+        async with semaphore:
+            start = time.perf_counter()
+            await func(plan, code)
+            latencies[kind].append(time.perf_counter() - start)
+
+    # Уникальная последняя строка делает каждое решение новым для кэша результатов
+    jobs = [
+        (submission.kind, f"{submission.code}\n_run = {run}\n")
+        for run in range(repeat)
+        for submission in build_corpus(kinds)
+    ]
+    start = time.perf_counter()
+    await asyncio.gather(*(run_one(kind, code) for kind, code in jobs))
+    total = time.perf_counter() - start
+
+    all_latencies = [latency for values in latencies.values() for latency in values]
+    return {
+        **summarize(all_latencies),
+        "throughput_per_sec": round(len(jobs) / total, 2),
+        "kinds": {kind: summarize(values) for kind, values in latencies.items()},
+    }
+
+
+def compare(current: dict, baseline: dict, tolerance: float) -> bool:
+    """
+    Печатает изменения относительно базовой линии. Возвращает False, если есть регрессия.
+    """
+    ok = True
+    print(f"\n{'mode':<16}{'p95 base':>12}{'p95 now':>12}{'thr base':>12}{'thr now':>12}")
+    for mode, result in current["modes"].items():
+        base = baseline["modes"].get(mode)
+        if base is None:
+            continue
+        slower = result["p95_ms"] > base["p95_ms"] * (1 + tolerance)
+        fewer = result["throughput_per_sec"] < base["throughput_per_sec"] * (1 - tolerance)
+        mark = "  REGRESSION" if slower or fewer else ""
+        print(f"{mode:<16}{base['p95_ms']:>12.2f}{result['p95_ms']:>12.2f}"
+              f"{base['throughput_per_sec']:>12.2f}{result['throughput_per_sec']:>12.2f}{mark}")
+        ok = ok and not (slower or fewer)
+    return ok
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modes", nargs="+", default=list(MODES), choices=list(MODES))
+    parser.add_argument("--kinds", nargs="+", default=list(GENERATORS), choices=list(GENERATORS),
+                        help="Виды решений из корпуса")
+    parser.add_argument("--repeat", type=int, default=3, help="Сколько раз прогоняется корпус")
+    parser.add_argument("--concurrency", type=int, default=WORKERS, help="Одновременно проверяемых решений")
+    parser.add_argument("--test-cases", type=int, default=10, help="Количество тестов в задаче")
+    parser.add_argument("--save", metavar="NAME", help="Сохранить результат как базовую линию")
+    parser.add_argument("--compare", metavar="NAME", help="Сравнить с сохраненной базовой линией")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Допустимое ухудшение, доля")
+    args = parser.parse_args()
+
+    plan = build_plan(args.test_cases)
+    result_cache.clear()
+
+    async def run_all() -> dict:
+        # Прогрев пула, чтобы не учитывать запуск интерпретаторов
+        await _run_tests(plan, build_corpus(["correct"])[0].code)
+        return {mode: await run_mode(mode, plan, args.kinds, args.repeat, args.concurrency) for mode in args.modes}
+
+    current = {
+        "meta": {
+            "python": platform.python_version(),
+            "cpu_count": os.cpu_count(),
+            "workers": WORKERS,
+            "repeat": args.repeat,
+            "concurrency": args.concurrency,
+            "test_cases": args.test_cases,
+            "kinds": args.kinds,
+        },
+        "modes": asyncio.run(run_all()),
+    }
+    pool.close()
+
+    for mode, result in current["modes"].items():
+        print(f"{mode:<16} p50 {result['p50_ms']:9.2f} ms   p95 {result['p95_ms']:9.2f} ms   "
+              f"throughput {result['throughput_per_sec']:8.2f}/s")
+        for kind, stats in result["kinds"].items():
+            print(f"  {kind:<14} p50 {stats['p50_ms']:9.2f} ms   p95 {stats['p95_ms']:9.2f} ms")
+
+    if args.save:
+        BASELINES_DIR.mkdir(exist_ok=True)
+        path = BASELINES_DIR / f"{args.save}.json"
+        path.write_text(json.dumps(current, indent=2, ensure_ascii=False) + "\n", encoding="utf-8")
+        print(f"\nbaseline saved to {path}")
+
+    if args.compare:
+        baseline = json.loads((BASELINES_DIR / f"{args.compare}.json").read_text(encoding="utf-8"))
+        if baseline["meta"] != current["meta"]:
+            print("\nwarning: baseline was recorded with different parameters")
+        if not compare(current, baseline, args.tolerance):
+            raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
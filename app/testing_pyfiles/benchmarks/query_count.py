@@ -0,0 +1,95 @@
+"""
+Проверка количества запросов к БД у методов, которые должны выполняться за один запрос.
+
+Запросы считаются по событию before_cursor_execute движка, поэтому учитываются и ленивые загрузки связей.
+По умолчанию используются студент и предмет из init.sql.
+
+    python -m app.testing_pyfiles.benchmarks.query_count [--user-id 2] [--subject-id 1]
+
+Код возврата 1, если какой-либо метод выполняет больше запросов, чем ожидается, или читает код решений,
+а также если статусы задач GET /tasks/{subject_id} расходятся с прежним расчетом по решениям каждой задачи.
+"""
+import argparse
+import sys
+from contextlib import contextmanager
+
+from sqlalchemy import event
+
+from app.db.db import engine
+from app.db.task_methods import get_subject_tasks_with_status, get_tasks_by_subject, get_tasks_progress, \
+    get_user_solutions_by_task
+
+
+@contextmanager
+def count_queries():
+    """
+    Собирает тексты SQL-запросов, выполненных внутри блока.
+    """
+    statements = []
+
+    def on_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", on_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", on_execute)
+
+
+def per_task_statuses(subject_id: int, user_id: int) -> list[tuple[int, str]]:
+    """
+    Статусы задач предмета, вычисленные по-старому: решения пользователя загружаются для каждой задачи.
+    """
+    tasks = get_tasks_by_subject(subject_id)
+    if isinstance(tasks, str):
+        return []
+    statuses = []
+    for task in tasks:
+        solutions = get_user_solutions_by_task(user_id, task.id)
+        statuses.append((task.id, "Success" if any(sol.status == "Success" for sol in solutions) else "Failed"))
+    return statuses
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Проверка количества запросов к БД")
+    parser.add_argument("--user-id", type=int, default=2)
+    parser.add_argument("--subject-id", type=int, default=1)
+    args = parser.parse_args()
+
+    # Название, вызов, максимальное количество запросов
+    checks = [
+        ("GET /tasks/{subject_id} (get_subject_tasks_with_status)",
+         lambda: get_subject_tasks_with_status(args.subject_id, args.user_id), 1),
+        ("GET /labs (get_tasks_progress)",
+         lambda: get_tasks_progress([args.user_id], published_only=True), 1),
+    ]
+
+    failed = 0
+    for name, call, expected in checks:
+        with count_queries() as statements:
+            result = call()
+        # Код решений хранится только в SolutionCode
+        reads_code = any('"SolutionCode"' in statement for statement in statements)
+        ok = len(statements) <= expected and not reads_code
+        failed += not ok
+        print(f"{'OK  ' if ok else 'FAIL'} {name:56} queries: {len(statements)} (expected {expected}), "
+              f"reads code: {reads_code}, rows: {len(result)}")
+        if not ok:
+            for statement in statements:
+                print("    " + " ".join(statement.split()))
+
+    statuses = [(task.id, task.status) for task in get_subject_tasks_with_status(args.subject_id, args.user_id)]
+    expected_statuses = per_task_statuses(args.subject_id, args.user_id)
+    ok = statuses == expected_statuses
+    failed += not ok
+    print(f"{'OK  ' if ok else 'FAIL'} {'GET /tasks/{subject_id} statuses':56} {statuses}")
+    if not ok:
+        print(f"    expected: {expected_statuses}")
+
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+import ast
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+from app.config.config import init_config
+from app.schemas.tests import ExecutionLimits
+
+cfg = init_config()['grading']
+
+
+def normalize_source(code_str: str) -> str:
+    """
+    Приводит код к каноническому виду через AST: пробелы, пустые строки и комментарии не влияют на результат.
+    Код с синтаксической ошибкой возвращается как есть.
+    """
+    try:
+        return ast.dump(ast.parse(code_str))
+    except (SyntaxError, ValueError):
+        return code_str
+
+
+def solution_hash(code_str: str) -> str:
+    return hashlib.sha256(normalize_source(code_str).encode()).hexdigest()
+
+
+def suite_fingerprint(test_cases, teacher_formula: str | None, input_variables: str | None,
+                      limits: ExecutionLimits) -> str:
+    """
+    Отпечаток набора тестов задачи. Меняется при любом изменении тестов (в том числе файлов с данными),
+    формул, входных переменных или лимитов.
+    """
+    digest = hashlib.sha256()
+    digest.update(limits.model_dump_json().encode())
+    for part in (teacher_formula or "", input_variables or ""):
+        digest.update(part.encode())
+        digest.update(b"\0")
+    for test_case in test_cases:
+        digest.update(test_case.inp.encode())
+        digest.update(b"\0")
+        digest.update(test_case.out.encode())
+        digest.update(b"\0")
+        # Файлы теста не читаются целиком: изменение файла определяется по размеру и времени изменения
+        for path in (test_case.inp_path, test_case.out_path):
+            if path:
+                try:
+                    stat = os.stat(path)
+                    digest.update(f"{path}:{stat.st_size}:{stat.st_mtime_ns}".encode())
+                except OSError:
+                    digest.update(f"{path}:missing".encode())
+                digest.update(b"\0")
+    return digest.hexdigest()
+
+
+class ResultCache:
+    """
+    LRU-кэш результатов запуска тестов по ключу (хэш решения, отпечаток набора тестов).
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._items: OrderedDict[str, dict] = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(code_str: str, fingerprint: str) -> str:
+        return f"{solution_hash(code_str)}:{fingerprint}"
+
+    def get(self, key: str) -> dict | None:
+        with self._lock:
+            result = self._items.get(key)
+            if result is not None:
+                self._items.move_to_end(key)
+            return result
+
+    def put(self, key: str, result: dict) -> None:
+        with self._lock:
+            self._items[key] = result
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+
+
+result_cache = ResultCache(cfg['cache_size'])
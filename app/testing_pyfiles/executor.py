@@ -0,0 +1,105 @@
+import asyncio
+import atexit
+import hashlib
+import marshal
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from app.config.config import init_config
+from app.schemas.tests import ExecutionLimits, ExecutionResult
+from app.testing_pyfiles.pool import WorkerPool
+
+cfg = init_config()['grading']
+
+# Лимиты на один тест по умолчанию, задача может переопределить их (Task.time_limit, memory_limit, output_limit)
+DEFAULT_LIMITS = ExecutionLimits(
+    wall_time=cfg['wall_time'],
+    cpu_time=cfg['cpu_time'],
+    memory_mb=cfg['memory_mb'],
+    output_kb=cfg['output_kb'],
+)
+WORKERS = cfg['workers'] or os.cpu_count() or 1  # 0 в конфиге - по числу ядер
+
+# Код студента выполняется в прогретых процессах пула, поэтому параллельные проверки занимают все ядра
+pool = WorkerPool(size=WORKERS, max_runs=cfg['max_runs_per_worker'])
+atexit.register(pool.close)
+
+# Потоки только ждут ответа от процессов пула, по одному на процесс
+_executor = ThreadPoolExecutor(max_workers=WORKERS, thread_name_prefix="grading")
+
+# Разбор и компиляция кода - вызовы C, которые держат GIL все время работы, на больших решениях это
+# десятки миллисекунд. В потоке они все равно останавливают event loop, поэтому большие решения
+# готовятся к проверке в отдельных процессах, а небольшие - сразу, без затрат на передачу между процессами
+PREPARE_INLINE_SIZE = cfg['prepare_inline_kb'] * 1024
+_prepare_executor = ProcessPoolExecutor(max_workers=cfg['prepare_workers'] or WORKERS,
+                                        mp_context=multiprocessing.get_context("spawn"))
+atexit.register(_prepare_executor.shutdown, cancel_futures=True)
+
+
+async def prepare_async(func, code_str: str, *args):
+    """
+    Выполняет func(code_str, *args) - разбор, компиляцию или другую подготовку кода решения,
+    не блокируя event loop на больших решениях.
+
+    :param func: Функция уровня модуля (передается в процесс по имени)
+    :param code_str: Код решения
+    :return: Результат func, исключения func пробрасываются
+    """
+    if len(code_str) <= PREPARE_INLINE_SIZE:
+        return func(code_str, *args)
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_prepare_executor, func, code_str, *args)
+
+
+class CompiledCode:
+    """
+    Код студента, скомпилированный один раз на всё решение.
+    Объект кода сериализуется через marshal и передается в процессы пула.
+
+    :raises SyntaxError: Если код не компилируется
+    """
+
+    def __init__(self, code_str: str):
+        code = compile(code_str, "solution.py", "exec", dont_inherit=True)
+        self.data = marshal.dumps(code)
+        self.key = hashlib.sha256(self.data).hexdigest()
+
+
+def execute(code: CompiledCode, input_data: str, limits: ExecutionLimits = DEFAULT_LIMITS,
+            input_path: str | None = None, expected_path: str | None = None) -> ExecutionResult:
+    """
+    Выполняет код студента в отдельном процессе с ограничениями по времени, памяти и размеру вывода.
+
+    :param code: Скомпилированный код студента
+    :param input_data: Данные, которые подаются на stdin
+    :param limits: Лимиты на один запуск
+    :param input_path: Файл с входными данными, подается на stdin вместо input_data
+    :param expected_path: Файл с ожидаемым выводом, вывод сравнивается с ним по токенам по мере поступления
+    :return: ExecutionResult с выводом программы, затраченным временем и памятью
+    """
+    for path in (input_path, expected_path):
+        if path and not os.path.isfile(path):
+            return ExecutionResult(error=f"Test data file not found: {os.path.basename(path)}", passed=False)
+
+    result = pool.run({
+        "code_key": code.key,
+        "code": code.data,
+        "input": input_data,
+        "wall_time": limits.wall_time,
+        "cpu_time": limits.cpu_time,
+        "memory_limit": limits.memory_mb * 1024 * 1024,
+        "output_limit": limits.output_kb * 1024,
+        "input_path": input_path,
+        "expected_path": expected_path,
+    })
+    return ExecutionResult(**result)
+
+
+async def execute_async(code: CompiledCode, input_data: str, limits: ExecutionLimits = DEFAULT_LIMITS,
+                        input_path: str | None = None, expected_path: str | None = None) -> ExecutionResult:
+    """
+    Асинхронная обертка над execute, не блокирующая event loop.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executor, execute, code, input_data, limits, input_path, expected_path)
@@ -0,0 +1,212 @@
+import ast
+import hashlib
+import re
+from collections import Counter
+from typing import Iterator, List
+
+from app.testing_pyfiles.executor import prepare_async
+
+var_regex = re.compile(r'[a-zA-Z_][a-zA-Z0-9_]*')
+expr_regex = re.compile(r'([\w\s\+\-\*/\^\=()]+)')
+operations_in_math = '+-*/=^'
+
+# Операторы присваивания, которые сравниваются с формулами преподавателя целиком
+ASSIGN_NODES = (ast.Assign, ast.AugAssign, ast.AnnAssign)
+IGNORED_FIELDS = ('ctx', 'type_comment')
+OPERATOR_CHARS = '+-*/%=<>&|^~@'
+
+
+def _canonical(node, names: dict[str, str]) -> str:
+    """
+    Каноническая запись узла AST: имена переменных заменяются на VAR0, VAR1, ... в порядке обхода,
+    скобки, пробелы и комментарии в запись не попадают.
+    """
+    if isinstance(node, ast.Name):
+        return names.setdefault(node.id, f"VAR{len(names)}")
+    if isinstance(node, ast.AST):
+        fields = ",".join(
+            _canonical(getattr(node, field, None), names) for field in node._fields if field not in IGNORED_FIELDS
+        )
+        return f"{type(node).__name__}({fields})"
+    if isinstance(node, list):
+        return "[" + ",".join(_canonical(item, names) for item in node) + "]"
+    return repr(node)
+
+
+def fingerprint(node: ast.AST) -> str:
+    return hashlib.blake2b(_canonical(node, {}).encode(), digest_size=16).hexdigest()
+
+
+def shape(node: ast.AST) -> tuple:
+    """
+    Грубая форма узла (тип узла, тип значения, операция и типы её операндов)
+    для быстрого отсева строк без подсчета отпечатка.
+    """
+    value = getattr(node, 'value', node) if isinstance(node, ast.stmt) else node
+    return (
+        type(node), type(value), type(getattr(value, 'op', None)),
+        type(getattr(value, 'left', None)), type(getattr(value, 'right', None))
+    )
+
+
+def operators(formula: str) -> tuple[tuple[str, int], ...]:
+    """
+    Количество символов операторов в формуле. Строка с такой же структурой содержит их не меньше.
+    """
+    return tuple(Counter(char for char in formula if char in OPERATOR_CHARS).items())
+
+
+def normalize_formula(formula: str) -> str:
+    """
+    Запасная нормализация для формул, которые не разбираются как код Python:
+    имена переменных заменяются регулярным выражением, пробелы удаляются.
+    """
+    var_map: dict[str, str] = {}
+
+    def rename(match: re.Match) -> str:
+        return var_map.setdefault(match.group(), f"VAR{len(var_map)}")
+
+    # Замена за один проход, поэтому имена вида VAR1 у студента не путаются с уже замененными
+    normalized = var_regex.sub(rename, formula).replace(' ', '')
+    if normalized.endswith(';'):
+        normalized = normalized[:-1]
+
+    return normalized
+
+
+def extract_expressions(line: str) -> List[str]:
+    expressions = []
+
+    for match in expr_regex.finditer(line):
+        expr = match.group(1).strip()
+        if any(op in expr for op in operations_in_math):
+            expressions.append(expr)
+
+    return expressions
+
+
+class TeacherFormulas:
+    """
+    Формулы преподавателя, разобранные один раз на задачу (хранятся в плане проверки).
+    Каждой формуле соответствует отпечаток канонического AST: присваивание целиком или выражение.
+    Формулы, которые не разбираются как код Python, сравниваются по текстовой нормализации.
+    """
+
+    def __init__(self, formulas: list[str]):
+        self.formulas = formulas
+        self.statements: dict[str, list[int]] = {}  # отпечаток присваивания -> номера формул
+        self.expressions: dict[str, list[int]] = {}  # отпечаток выражения -> номера формул
+        self.texts: dict[str, list[int]] = {}  # текстовая нормализация -> номера формул
+        self.shapes: set[tuple] = set()
+        self.operators: set[tuple[tuple[str, int], ...]] = set()
+
+        for i, formula in enumerate(formulas):
+            try:
+                body = ast.parse(formula.strip()).body
+            except (SyntaxError, ValueError):
+                body = []
+
+            if len(body) == 1 and isinstance(body[0], (*ASSIGN_NODES, ast.Expr)):
+                self.operators.add(operators(formula))
+
+            if len(body) == 1 and isinstance(body[0], ASSIGN_NODES):
+                self.statements.setdefault(fingerprint(body[0]), []).append(i)
+                self.shapes.add(shape(body[0]))
+            elif len(body) == 1 and isinstance(body[0], ast.Expr):
+                self.expressions.setdefault(fingerprint(body[0].value), []).append(i)
+                self.shapes.add(shape(body[0].value))
+            else:
+                self.texts.setdefault(normalize_formula(formula), []).append(i)
+
+
+def _walk(node: ast.AST, expressions: bool) -> Iterator[ast.AST]:
+    """
+    Обход в глубину в порядке следования в исходнике. Без expressions в выражения не спускается.
+    """
+    for child in ast.iter_child_nodes(node):
+        if expressions or not isinstance(child, ast.expr):
+            yield child
+            yield from _walk(child, expressions)
+
+
+class TeacherList:
+    """
+    Сопоставление формул студента с формулами преподавателя.
+    Отпечатки формул преподавателя берутся готовыми из TeacherFormulas, поэтому для каждого присваивания студента
+    выполняется только поиск его отпечатка в словаре. Состояние хранится в экземпляре.
+    """
+
+    def __init__(self, teacher: TeacherFormulas):
+        self.teacher = teacher
+        self.formulas_student: dict[int, str] = {}  # номер формулы преподавателя -> строка студента
+        self._unmatched: dict[str, dict[str, list[int]]] = {
+            kind: {key: list(numbers) for key, numbers in index.items()}
+            for kind, index in (
+                ("statements", teacher.statements),
+                ("expressions", teacher.expressions),
+                ("texts", teacher.texts),
+            )
+        }
+
+    def binding_formulas(self, a: str, i: int):  # a - student formula, i - teacher formula number
+        if a.endswith(';'):
+            a = a[:-1]
+        self.formulas_student[i] = a
+
+    def match(self, kind: str, key: str, line: str) -> bool:
+        unmatched = self._unmatched[kind]
+        numbers = unmatched.get(key)
+        if not numbers:
+            return False
+        self.binding_formulas(line, numbers.pop(0))
+        if not numbers:
+            del unmatched[key]
+        return True
+
+    def add_student_code(self, code_str: str):
+        lines = [line.rstrip() for line in code_str.splitlines()]
+        statements, expressions = self._unmatched["statements"], self._unmatched["expressions"]
+        shapes, signatures = self.teacher.shapes, self.teacher.operators
+        for line in lines:
+            if not statements and not expressions:
+                break
+            # Разбирается только строка, в которой есть все операторы хотя бы одной формулы преподавателя
+            if not any(all(line.count(char) >= count for char, count in signature) for signature in signatures):
+                continue
+            try:
+                tree = ast.parse(line.strip())
+            except (SyntaxError, ValueError):
+                continue
+            for node in _walk(tree, bool(expressions)):
+                if isinstance(node, ASSIGN_NODES):
+                    kind = "statements"
+                elif isinstance(node, ast.expr):
+                    kind = "expressions"
+                else:
+                    continue
+                if self._unmatched[kind] and shape(node) in shapes:
+                    self.match(kind, fingerprint(node), line)
+
+        if self._unmatched["texts"]:
+            for line in lines:
+                for expr in extract_expressions(line):
+                    if self.match("texts", normalize_formula(expr), line):
+                        break
+
+    def result(self) -> tuple[str, bool]:
+        """
+        :return: Найденные строки студента по порядку формул преподавателя и признак того, что найдены все формулы
+        """
+        res = "".join(self.formulas_student[i] + '\n' for i in sorted(self.formulas_student))
+        return res, len(self.formulas_student) == len(self.teacher.formulas)
+
+
+def match_formulas(code_str: str, teacher: TeacherFormulas) -> tuple[str, bool]:
+    teacher_list = TeacherList(teacher)
+    teacher_list.add_student_code(code_str)
+    return teacher_list.result()
+
+
+async def check_formulas(teacher: TeacherFormulas, code_str) -> tuple[str, bool]:
+    # Разбор кода студента занимает процессор, большие решения разбираются вне event loop
+    return await prepare_async(match_formulas, code_str, teacher)
@@ -0,0 +1,277 @@
+import asyncio
+import math
+import time
+import uuid
+from typing import Awaitable, Callable
+
+from app.config.config import init_config
+from app.core.metrics import Counter, Gauge, Histogram, registry
+from app.core.timing import current_timings, record, use_timings
+from app.db.job_methods import add_grading_job, count_queued_grading_jobs, get_grading_job
+from app.schemas.test import ResponseTest, GradingJobResponse
+from app.testing_pyfiles.plan import GradingPlan
+from app.testing_pyfiles.test import EventCallback, check_file
+
+cfg = init_config()['grading']
+
+MAX_WAIT = 30  # Максимальное время long-poll ожидания результата, секунды
+
+queue_wait_seconds = registry.register(Histogram(
+    "sdo_grading_queue_wait_seconds", "Время ожидания задания на проверку в очереди"
+))
+rejected_total = registry.register(Counter(
+    "sdo_grading_rejected_total", "Задания на проверку, отклоненные из-за заполненной очереди"
+))
+
+
+class QueueFull(Exception):
+    """
+    Очередь проверки заполнена. retry_after - через сколько секунд стоит повторить запрос.
+    """
+
+    def __init__(self, retry_after: int):
+        super().__init__("Grading queue is full, try again later.")
+        self.retry_after = retry_after
+
+
+class GradingJob:
+    """
+    Задание на проверку решения. Результат хранится в памяти процесса job_ttl секунд.
+    """
+
+    def __init__(self, user_id: int, task_id: int, job_id: str | None = None):
+        self.id = job_id or uuid.uuid4().hex
+        self.user_id = user_id
+        self.task_id = task_id
+        self.status = "queued"  # queued -> running -> done | error
+        self.result: ResponseTest | None = None
+        self.error: str | None = None
+        self.created_at = time.monotonic()
+        # Длительности этапов запроса, поставившего задание: проверка выполняется в обработчике очереди
+        self.timings = current_timings()
+        self.finished_at: float | None = None
+        self.done = asyncio.Event()
+
+    def to_response(self) -> GradingJobResponse:
+        return GradingJobResponse(
+            job_id=self.id,
+            status=self.status,
+            result=self.result,
+            error=self.error,
+        )
+
+
+class JobQueue:
+    """
+    Очередь заданий на проверку с фиксированным числом фоновых обработчиков.
+    Обработчики запускаются в event loop приложения при первой постановке задания.
+    В очереди ждут не больше max_queue заданий, новые задания сверх этого отклоняются (QueueFull),
+    чтобы во время наплыва проверок запросы не копились без ограничения.
+    """
+
+    def __init__(self, workers: int, ttl: int, max_queue: int):
+        self.workers = workers
+        self.ttl = ttl
+        self.max_queue = max_queue
+        self.running = 0
+        self._avg_duration = 1.0  # Скользящее среднее времени проверки, секунды
+        self._queue: asyncio.Queue | None = None
+        self._jobs: dict[str, GradingJob] = {}
+        self._in_flight: dict[int, GradingJob] = {}  # ID решения -> незавершенное задание
+        self._tasks: list[asyncio.Task] = []
+        self._loop: asyncio.AbstractEventLoop | None = None
+
+    def _ensure_started(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._loop is loop:
+            return
+        # Обработчики привязаны к event loop, в котором были запущены
+        self._loop = loop
+        self._queue = asyncio.Queue()
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    def _prune(self) -> None:
+        now = time.monotonic()
+        expired = [
+            job_id for job_id, job in self._jobs.items()
+            if job.finished_at is not None and now - job.finished_at > self.ttl
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+    def depth(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def retry_after(self) -> int:
+        """
+        Оценка времени, за которое освободится место в очереди, секунды.
+        """
+        return max(1, math.ceil(self.depth() / self.workers * self._avg_duration))
+
+    async def _worker(self) -> None:
+        while True:
+            job, solution_id, func = await self._queue.get()
+            job.status = "running"
+            self.running += 1
+            started_at = time.monotonic()
+            use_timings(job.timings)
+            record("queue", started_at - job.created_at)
+            queue_wait_seconds.observe(started_at - job.created_at)
+            try:
+                job.result = await func()
+                job.status = "done"
+            except Exception as e:
+                job.error = str(e)
+                job.status = "error"
+            finally:
+                job.finished_at = time.monotonic()
+                job.done.set()
+                self._queue.task_done()
+                if self._in_flight.get(solution_id) is job:
+                    del self._in_flight[solution_id]
+                use_timings(None)
+                self.running -= 1
+                self._avg_duration = 0.9 * self._avg_duration + 0.1 * (job.finished_at - started_at)
+
+    async def submit(self, job: GradingJob, plan: GradingPlan, code: str, solution_id: int,
+                     on_event: EventCallback | None = None) -> GradingJob:
+        """
+        Ставит задание в очередь и сразу возвращает его, не дожидаясь проверки.
+        Если это же решение уже ждет проверки или проверяется (повторное нажатие, повтор запроса клиентом),
+        возвращается существующее задание: проверка выполняется один раз, результат получают все.
+
+        :raises QueueFull: Если в очереди уже max_queue заданий
+        """
+        self._ensure_started()
+        active = self._in_flight.get(solution_id)
+        if active is not None and not active.done.is_set():
+            return active
+        if self.depth() >= self.max_queue:
+            rejected_total.inc()
+            raise QueueFull(self.retry_after())
+        self._prune()
+        self._jobs[job.id] = job
+        self._in_flight[solution_id] = job
+        func: Callable[[], Awaitable[ResponseTest]] = lambda: grade_solution(plan, code, solution_id, on_event)
+        self._queue.put_nowait((job, solution_id, func))
+        return job
+
+    async def get(self, job_id: str) -> GradingJob | None:
+        return self._jobs.get(job_id)
+
+    @staticmethod
+    async def wait(job: GradingJob, timeout: float | None) -> GradingJob:
+        """
+        Ждет завершения задания не дольше timeout секунд (None - без ограничения).
+        """
+        try:
+            await asyncio.wait_for(job.done.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        return job
+
+
+class PostgresJobQueue:
+    """
+    Очередь заданий в таблице GradingJob. API только добавляет задания, проверку выполняют воркеры
+    (python -m app.testing_pyfiles.worker), которых может быть сколько угодно на разных машинах.
+    Результат ожидается опросом таблицы. Ход проверки по тестам (on_event) через эту очередь не передается.
+    """
+
+    def __init__(self, poll_interval: float, max_queue: int, lock: bool):
+        self.poll_interval = poll_interval
+        self.max_queue = max_queue
+        self.lock = lock
+        # Длина очереди при последнем добавлении задания: метрика не обращается к БД при каждом сборе
+        self.last_depth = 0
+
+    def depth(self) -> int:
+        self.last_depth = count_queued_grading_jobs()
+        return self.last_depth
+
+    async def submit(self, job: GradingJob, plan: GradingPlan, code: str, solution_id: int,
+                     on_event: EventCallback | None = None) -> GradingJob:
+        """
+        Добавляет задание в таблицу очереди. Если решение уже ждет проверки или проверяется,
+        возвращается существующее задание (в том числе созданное другим процессом API).
+
+        :raises QueueFull: Если в очереди уже max_queue заданий
+        """
+        if await asyncio.to_thread(self.depth) >= self.max_queue:
+            rejected_total.inc()
+            # Число воркеров API не знает, поэтому время повтора не оценивается
+            raise QueueFull(cfg['retry_after'])
+        job_id = await asyncio.to_thread(add_grading_job, job.id, job.user_id, job.task_id, solution_id, self.lock)
+        if job_id != job.id:
+            job = GradingJob(job.user_id, job.task_id, job_id=job_id)
+        return job
+
+    @staticmethod
+    def _apply(job: GradingJob, data: dict) -> None:
+        job.status = data['status']
+        job.error = data['error']
+        if data['result']:
+            job.result = ResponseTest.model_validate_json(data['result'])
+        if job.status in ("done", "error"):
+            job.finished_at = time.monotonic()
+            job.done.set()
+
+    async def get(self, job_id: str) -> GradingJob | None:
+        data = await asyncio.to_thread(get_grading_job, job_id)
+        if data is None:
+            return None
+        job = GradingJob(data['user_id'], data['task_id'], job_id=data['id'])
+        self._apply(job, data)
+        return job
+
+    async def wait(self, job: GradingJob, timeout: float | None) -> GradingJob:
+        """
+        Ждет завершения задания не дольше timeout секунд (None - без ограничения), опрашивая таблицу.
+        """
+        loop = asyncio.get_running_loop()
+        deadline = None if timeout is None else loop.time() + timeout
+        while not job.done.is_set():
+            data = await asyncio.to_thread(get_grading_job, job.id)
+            if data is None:
+                job.status = "error"
+                job.error = "Job not found."
+                job.done.set()
+                break
+            self._apply(job, data)
+            if job.done.is_set():
+                break
+            delay = self.poll_interval
+            if deadline is not None:
+                delay = min(delay, deadline - loop.time())
+                if delay <= 0:
+                    break
+            await asyncio.sleep(delay)
+        return job
+
+
+if cfg['queue_backend'] == "postgres":
+    job_queue = PostgresJobQueue(poll_interval=cfg['worker_poll_interval'], max_queue=cfg['max_queue'],
+                                 lock=cfg['single_flight_lock'])
+    # Значение на момент последнего добавления задания в этом процессе API
+    registry.register(Gauge("sdo_grading_queue_depth", "Задания, ожидающие проверки",
+                            lambda: job_queue.last_depth))
+else:
+    job_queue = JobQueue(workers=cfg['job_workers'], ttl=cfg['job_ttl'], max_queue=cfg['max_queue'])
+    registry.register(Gauge("sdo_grading_jobs_running", "Выполняемые проверки", lambda: job_queue.running))
+    registry.register(Gauge("sdo_grading_queue_depth", "Задания, ожидающие проверки", job_queue.depth))
+
+
+async def grade_solution(plan: GradingPlan, code: str, solution_id: int,
+                         on_event: EventCallback | None = None) -> ResponseTest:
+    """
+    Проверяет решение и формирует ответ в формате /test. Статус решения обновляется в check_file.
+    """
+    res_check = await check_file(plan, code, solution_id, on_event)
+    return ResponseTest(
+        status=res_check.execution_status,
+        formulas_output=res_check.formulas_output,
+        code_output=res_check.code_output,
+        execution_time=res_check.execution_time,
+        code_length=res_check.code_length,
+        peak_memory_kb=res_check.peak_memory_kb,
+    )
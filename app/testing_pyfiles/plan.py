@@ -0,0 +1,124 @@
+import os
+import threading
+from collections import OrderedDict
+from typing import NamedTuple
+
+from app.config.config import init_config
+from app.core.timing import stage
+from app.db.task_methods import get_grading_data
+from app.schemas.tests import ExecutionLimits
+from app.testing_pyfiles.cache import suite_fingerprint
+from app.testing_pyfiles.executor import DEFAULT_LIMITS
+from app.testing_pyfiles.formulas import TeacherFormulas
+
+cfg = init_config()['grading']
+
+
+class PlanTestCase(NamedTuple):
+    inp: str
+    out: str  # Ожидаемый вывод без пробельных символов по краям
+    # Тест с данными в файлах: вход подается из inp_path, вывод сравнивается с out_path по токенам
+    inp_path: str | None = None
+    out_path: str | None = None
+
+
+def test_data_path(path: str | None) -> str | None:
+    """
+    Абсолютный путь к файлу теста. В БД хранится путь относительно каталога grading.test_data_dir.
+    """
+    if not path:
+        return None
+    return os.path.abspath(os.path.join(cfg['test_data_dir'], path))
+
+
+def task_limits(task_data: dict) -> ExecutionLimits:
+    """
+    Лимиты задачи поверх значений по умолчанию. Реальное время всегда больше процессорного.
+    """
+    cpu_time = task_data.get('time_limit') or DEFAULT_LIMITS.cpu_time
+    return ExecutionLimits(
+        wall_time=max(DEFAULT_LIMITS.wall_time, cpu_time + 1),
+        cpu_time=cpu_time,
+        memory_mb=task_data.get('memory_limit') or DEFAULT_LIMITS.memory_mb,
+        output_kb=task_data.get('output_limit') or DEFAULT_LIMITS.output_kb,
+    )
+
+
+class GradingPlan:
+    """
+    Всё, что нужно для проверки решений задачи, подготовленное один раз:
+    формулы преподавателя и их отпечатки, входные переменные, тесты, лимиты и отпечаток для кэша результатов.
+    """
+
+    def __init__(self, task_data: dict, test_cases: list):
+        self.task_id: int = task_data['id']
+        self.subject_id: int = task_data['subject_id']
+        self.status: str = task_data['status']
+        self.teacher_formulas: list[str] = [
+            line.rstrip() for line in (task_data['teacher_formula'] or "").splitlines()
+        ]
+        # Отпечатки формул считаются один раз на план, а не при каждой проверке
+        self.formulas = TeacherFormulas(self.teacher_formulas)
+        self.test_cases: list[PlanTestCase] = [
+            PlanTestCase(
+                test_case.inp,
+                test_case.out.strip(),
+                test_data_path(test_case.inp_path),
+                test_data_path(test_case.out_path),
+            )
+            for test_case in test_cases
+        ]
+        self.limits: ExecutionLimits = task_limits(task_data)
+        self.fingerprint: str = suite_fingerprint(
+            self.test_cases, task_data['teacher_formula'], task_data['input_variables'], self.limits
+        )
+
+
+class PlanCache:
+    """
+    LRU-кэш планов проверки по task_id. План сбрасывается при изменении, удалении
+    или смене статуса лабораторной работы.
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._plans: OrderedDict[int, GradingPlan] = OrderedDict()
+        self._versions: dict[int, int] = {}
+        self._lock = threading.Lock()
+
+    def get(self, task_id: int) -> GradingPlan | None:
+        """
+        Возвращает план из кэша, а при промахе строит его по данным из БД.
+
+        :return: GradingPlan или None, если задача не найдена
+        """
+        with self._lock:
+            plan = self._plans.get(task_id)
+            if plan is not None:
+                self._plans.move_to_end(task_id)
+                return plan
+            version = self._versions.get(task_id, 0)
+
+        with stage("db_task_data"):
+            grading_data = get_grading_data(task_id)
+        if grading_data is None:
+            return None
+        plan = GradingPlan(*grading_data)
+
+        with self._lock:
+            # Пока план строился, задачу могли изменить - такой план не кэшируется
+            if self._versions.get(task_id, 0) != version:
+                return plan
+            self._plans[task_id] = plan
+            self._plans.move_to_end(task_id)
+            while len(self._plans) > self.max_size:
+                self._plans.popitem(last=False)
+        return plan
+
+    def invalidate(self, task_id: int) -> None:
+        with self._lock:
+            self._plans.pop(task_id, None)
+            self._versions[task_id] = self._versions.get(task_id, 0) + 1
+
+
+plan_cache = PlanCache(cfg['plan_cache_size'])
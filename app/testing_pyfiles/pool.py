@@ -0,0 +1,113 @@
+import os
+import queue
+import subprocess
+import sys
+import threading
+
+from app.testing_pyfiles.sandbox import read_message, write_message
+
+SANDBOX_PATH = os.path.join(os.path.dirname(__file__), "sandbox.py")
+
+
+class SandboxWorker:
+    """
+    Процесс с прогретым интерпретатором (sandbox.py), который выполняет задания по одному.
+    """
+
+    def __init__(self):
+        self.process = subprocess.Popen(
+            [sys.executable, "-I", SANDBOX_PATH],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            start_new_session=True,
+        )
+        self.runs = 0
+        self.code_key = None
+
+    def run(self, job: dict) -> dict:
+        # Код не пересылается, если процесс уже загрузил это же решение
+        if job["code_key"] == self.code_key:
+            job = {key: value for key, value in job.items() if key != "code"}
+        write_message(self.process.stdin.fileno(), job)
+        result = read_message(self.process.stdout.fileno())
+        if result is None:
+            raise RuntimeError("Sandbox worker exited unexpectedly")
+        self.code_key = job["code_key"]
+        self.runs += 1
+        return result
+
+    def is_alive(self) -> bool:
+        return self.process.poll() is None
+
+    def close(self) -> None:
+        self.process.kill()
+        self.process.wait()
+        self.process.stdin.close()
+        self.process.stdout.close()
+
+
+class WorkerPool:
+    """
+    Пул прогретых интерпретаторов. Процесс берется из пула на время одного теста
+    и пересоздается после max_runs запусков.
+    """
+
+    def __init__(self, size: int, max_runs: int):
+        self.size = size
+        self.max_runs = max_runs
+        self._idle: queue.Queue[SandboxWorker] = queue.Queue()
+        self._created = 0
+        self._lock = threading.Lock()
+        self._workers: set[SandboxWorker] = set()
+
+    def _spawn(self) -> SandboxWorker:
+        worker = SandboxWorker()
+        with self._lock:
+            self._workers.add(worker)
+        return worker
+
+    def _discard(self, worker: SandboxWorker) -> None:
+        worker.close()
+        with self._lock:
+            self._workers.discard(worker)
+
+    def _borrow(self) -> SandboxWorker:
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self._lock:
+            can_spawn = self._created < self.size
+            if can_spawn:
+                self._created += 1
+        if can_spawn:
+            return self._spawn()
+        return self._idle.get()
+
+    def _release(self, worker: SandboxWorker, broken: bool) -> None:
+        if broken or worker.runs >= self.max_runs or not worker.is_alive():
+            self._discard(worker)
+            worker = self._spawn()
+        self._idle.put(worker)
+
+    def run(self, job: dict) -> dict:
+        """
+        Выполняет задание на свободном процессе пула, блокируясь, пока такой не освободится.
+        """
+        worker = self._borrow()
+        broken = False
+        try:
+            return worker.run(job)
+        except (OSError, EOFError, RuntimeError):
+            broken = True
+            raise
+        finally:
+            self._release(worker, broken)
+
+    def close(self) -> None:
+        with self._lock:
+            workers = list(self._workers)
+            self._workers.clear()
+        for worker in workers:
+            worker.close()
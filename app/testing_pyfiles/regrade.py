@@ -0,0 +1,131 @@
+import asyncio
+import time
+import uuid
+
+from app.config.config import init_config
+from app.db.task_methods import get_latest_solutions_by_task, update_solutions_status
+from app.schemas.test import RegradeJobResponse
+from app.testing_pyfiles.plan import plan_cache
+from app.testing_pyfiles.test import grade_code
+
+cfg = init_config()['grading']
+
+
+class RegradeJob:
+    """
+    Перепроверка последних решений всех студентов по задаче после изменения её тестов.
+    """
+
+    def __init__(self, task_id: int):
+        self.id = uuid.uuid4().hex
+        self.task_id = task_id
+        self.status = "queued"  # queued -> running -> done | error | cancelled
+        self.total = 0
+        self.processed = 0
+        self.succeeded = 0
+        self.failed = 0
+        self.error: str | None = None
+        self.started_at: float | None = None
+        self.finished_at: float | None = None
+        self.task: asyncio.Task | None = None
+
+    @property
+    def elapsed(self) -> float:
+        if self.started_at is None:
+            return 0.0
+        return (self.finished_at or time.monotonic()) - self.started_at
+
+    def to_response(self) -> RegradeJobResponse:
+        elapsed = self.elapsed
+        return RegradeJobResponse(
+            job_id=self.id,
+            task_id=self.task_id,
+            status=self.status,
+            total=self.total,
+            processed=self.processed,
+            succeeded=self.succeeded,
+            failed=self.failed,
+            elapsed=round(elapsed, 3),
+            solutions_per_sec=round(self.processed / elapsed, 2) if elapsed else 0.0,
+            error=self.error,
+        )
+
+
+class RegradeManager:
+    """
+    Запускает перепроверки в фоне. Решения проверяются пачками по batch_size параллельно,
+    статусы каждой пачки записываются в БД одним обновлением.
+    На одну задачу одновременно выполняется не больше одной перепроверки: новая отменяет предыдущую.
+    """
+
+    def __init__(self, batch_size: int, ttl: int):
+        self.batch_size = batch_size
+        self.ttl = ttl
+        self._jobs: dict[str, RegradeJob] = {}
+        self._active: dict[int, RegradeJob] = {}
+
+    def _prune(self) -> None:
+        now = time.monotonic()
+        expired = [
+            job_id for job_id, job in self._jobs.items()
+            if job.finished_at is not None and now - job.finished_at > self.ttl
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+    def start(self, task_id: int) -> RegradeJob:
+        """
+        Запускает перепроверку задачи и сразу возвращает задание, не дожидаясь её окончания.
+        """
+        self._prune()
+        previous = self._active.get(task_id)
+        if previous is not None and previous.finished_at is None:
+            previous.task.cancel()
+
+        job = RegradeJob(task_id)
+        self._jobs[job.id] = job
+        self._active[task_id] = job
+        job.task = asyncio.create_task(self._run(job))
+        return job
+
+    def get(self, job_id: str) -> RegradeJob | None:
+        return self._jobs.get(job_id)
+
+    async def _run(self, job: RegradeJob) -> None:
+        job.status = "running"
+        job.started_at = time.monotonic()
+        try:
+            plan = await asyncio.to_thread(plan_cache.get, job.task_id)
+            if plan is None:
+                raise ValueError("Task not found.")
+
+            solutions = await asyncio.to_thread(get_latest_solutions_by_task, job.task_id)
+            job.total = len(solutions)
+
+            for start in range(0, len(solutions), self.batch_size):
+                batch = solutions[start:start + self.batch_size]
+                results = await asyncio.gather(*(grade_code(plan, code) for _, code in batch))
+
+                statuses = {
+                    solution_id: result.execution_status
+                    for (solution_id, _), result in zip(batch, results)
+                }
+                await asyncio.to_thread(update_solutions_status, statuses)
+
+                job.processed += len(batch)
+                job.succeeded += sum(1 for status in statuses.values() if status == "Success")
+                job.failed += sum(1 for status in statuses.values() if status != "Success")
+
+            job.status = "done"
+        except asyncio.CancelledError:
+            job.status = "cancelled"
+        except Exception as e:
+            job.error = str(e)
+            job.status = "error"
+        finally:
+            job.finished_at = time.monotonic()
+            if self._active.get(job.task_id) is job:
+                del self._active[job.task_id]
+
+
+regrade_manager = RegradeManager(batch_size=cfg['regrade_batch_size'], ttl=cfg['job_ttl'])
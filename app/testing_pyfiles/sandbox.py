@@ -0,0 +1,432 @@
+"""
+Прогретый интерпретатор для выполнения кода студентов.
+
+Запускается пулом из pool.py как отдельный процесс (python -I sandbox.py) и не импортирует
+ничего из приложения. Получает задания через stdin, на каждое задание делает fork()
+(copy-on-write копия уже прогретого интерпретатора), выполняет код в дочернем процессе
+с ограничениями и отвечает через stdout.
+"""
+# Модули, которые чаще всего используют студенты, импортируются заранее
+import math  # noqa: F401
+import re  # noqa: F401
+import sys
+
+import marshal
+import mmap
+import os
+import pickle
+import pwd
+import resource
+import select
+import signal
+import struct
+import time
+import traceback
+
+HEADER = struct.Struct(">I")
+READ_CHUNK = 65536
+STDERR_LIMIT = 65536  # Из stderr нужна только последняя строка с ошибкой
+OUTPUT_PREVIEW = 1024  # Сколько вывода сохраняется для отчета при сравнении с файлом
+TOKEN_PREVIEW = 64  # Максимальная длина токена в отчете о несовпадении
+TOKEN = re.compile(rb"\S+")
+SPACES = re.compile(rb"\s*")
+SANDBOX_USER = "nobody"  # Пользователь, от которого выполняется код студента, если пул запущен от root
+
+
+def read_message(fd: int):
+    header = _read_exact(fd, HEADER.size)
+    if header is None:
+        return None
+    body = _read_exact(fd, HEADER.unpack(header)[0])
+    if body is None:
+        return None
+    return pickle.loads(body)
+
+
+def write_message(fd: int, message) -> None:
+    body = pickle.dumps(message)
+    data = HEADER.pack(len(body)) + body
+    while data:
+        written = os.write(fd, data)
+        data = data[written:]
+
+
+def _read_exact(fd: int, size: int) -> bytes | None:
+    data = b""
+    while len(data) < size:
+        chunk = os.read(fd, size - len(data))
+        if not chunk:
+            return None
+        data += chunk
+    return data
+
+
+def _run_child(code, job: dict, protocol_fds: tuple[int, int], stdin_r: int, stdout_w: int, stderr_w: int) -> None:
+    """
+    Выполняется в дочернем процессе после fork() и никогда не возвращается.
+    """
+    status = 0
+    try:
+        # Код студента не должен иметь доступа к каналу связи с пулом
+        for fd in protocol_fds:
+            os.close(fd)
+        os.dup2(stdin_r, 0)
+        os.dup2(stdout_w, 1)
+        os.dup2(stderr_w, 2)
+        for fd in (stdin_r, stdout_w, stderr_w):
+            os.close(fd)
+        os.setsid()
+
+        resource.setrlimit(resource.RLIMIT_CPU, (job["cpu_time"], job["cpu_time"] + 1))
+        resource.setrlimit(resource.RLIMIT_FSIZE, (job["output_limit"], job["output_limit"]))
+        resource.setrlimit(resource.RLIMIT_AS, (job["memory_limit"], job["memory_limit"]))
+        resource.setrlimit(resource.RLIMIT_CORE, (0, 0))
+        # Для root RLIMIT_NPROC не действует, поэтому права сбрасываются до непривилегированного пользователя
+        if os.getuid() == 0:
+            user = pwd.getpwnam(SANDBOX_USER)
+            os.setgroups([])
+            os.setgid(user.pw_gid)
+            os.setuid(user.pw_uid)
+        # Код студента не может создавать процессы и потоки (защита от fork-бомбы)
+        resource.setrlimit(resource.RLIMIT_NPROC, (0, 0))
+
+        sys.stdin = open(0, "r", encoding="utf-8", closefd=False)
+        sys.stdout = open(1, "w", encoding="utf-8", closefd=False)
+        sys.stderr = open(2, "w", encoding="utf-8", closefd=False)
+
+        namespace = {"__name__": "__main__", "__builtins__": __builtins__}
+        try:
+            exec(code, namespace)
+        except SystemExit as e:
+            status = e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+        except BaseException as e:
+            sys.stderr.write(traceback.format_exception_only(type(e), e)[-1])
+            status = 1
+        finally:
+            sys.stdout.flush()
+            sys.stderr.flush()
+    except BaseException:
+        status = 1
+    os._exit(status)
+
+
+def _error_message(stderr: bytes) -> str:
+    lines = [line for line in stderr.decode(errors="replace").strip().splitlines() if line.strip()]
+    return lines[-1] if lines else "Process exited with non-zero status"
+
+
+def _map_file(path: str) -> tuple[object, memoryview]:
+    """
+    Отображает файл в память только для чтения. Пустой файл отобразить нельзя, для него возвращается пустой буфер.
+    """
+    with open(path, "rb") as file:
+        if os.fstat(file.fileno()).st_size == 0:
+            return None, memoryview(b"")
+        mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    return mapped, memoryview(mapped)
+
+
+def _preview(token: bytes | None) -> str:
+    if token is None:
+        return "<EOF>"
+    return bytes(token[:TOKEN_PREVIEW]).decode(errors="replace")
+
+
+class TokenComparator:
+    """
+    Потоковое сравнение вывода программы с файлом ожидаемого вывода по токенам (разделитель - пробельные символы).
+    Ожидаемый вывод отображается в память и читается по позиции, из вывода программы хранится
+    только незавершенный токен на границе блоков. Блок, побайтно совпадающий с ожидаемым выводом,
+    сравнивается целиком без разбора на токены.
+    """
+
+    def __init__(self, expected_path: str):
+        self._mapped, self._view = _map_file(expected_path)
+        self.expected_size = len(self._view)
+        self._position = 0  # Позиция в ожидаемом выводе, до которой всё совпало
+        self._partial = b""
+        self.tokens = 0  # Количество совпавших токенов
+        self.lines = 1  # Номер строки вывода программы, на которой находится текущий токен
+        self.mismatch: dict | None = None
+
+    def _fail(self, expected: bytes | None, actual: bytes | None) -> bool:
+        self.mismatch = {
+            "token": self.tokens + 1,
+            "line": self.lines,
+            "expected": _preview(expected),
+            "actual": _preview(actual),
+        }
+        return False
+
+    def _next_expected(self) -> bytes | None:
+        match = TOKEN.search(self._view, self._position)
+        if match is None:
+            self._position = len(self._view)
+            return None
+        self._position = match.end()
+        return match.group()
+
+    def _compare(self, actual: bytes) -> bool:
+        expected = self._next_expected()
+        if expected != actual:
+            return self._fail(expected, actual)
+        self.tokens += 1
+        return True
+
+    def feed(self, chunk: bytes) -> bool:
+        """
+        Сравнивает очередной блок вывода. Возвращает False при первом несовпадении.
+        """
+        data = self._partial + chunk
+        end = len(data)
+        # Последний токен может продолжиться в следующем блоке
+        if data and not data[-1:].isspace():
+            end = max(data.rfind(byte) for byte in (b" ", b"\n", b"\t", b"\r", b"\v", b"\f")) + 1
+        self._partial = data[end:]
+
+        # Быстрый путь: вывод побайтно совпадает с ожидаемым, в том числе по пробельным символам
+        region = memoryview(data)[:end]
+        expected = self._view[self._position:self._position + end]
+        if expected == region:
+            self._position += end
+            self.tokens += len(data[:end].split())
+            self.lines += data.count(b"\n", 0, end)
+            return True
+
+        position = 0
+        for match in TOKEN.finditer(data, 0, end):
+            self.lines += data.count(b"\n", position, match.start())
+            position = match.start()
+            if not self._compare(match.group()):
+                return False
+        self.lines += data.count(b"\n", position, end)
+        # Выравнивание по началу следующего токена, чтобы следующий блок снова мог пройти быстрым путем
+        self._position = SPACES.match(self._view, self._position).end()
+        return True
+
+    def finish(self) -> bool:
+        """
+        Сравнивает последний токен и проверяет, что ожидаемый вывод не длиннее фактического.
+        """
+        if self.mismatch is None and self._partial:
+            self._compare(self._partial)
+        self._partial = b""
+        if self.mismatch is None:
+            expected = self._next_expected()
+            if expected is not None:
+                self._fail(expected, None)
+        return self.mismatch is None
+
+    def close(self) -> None:
+        self._view.release()
+        if self._mapped is not None:
+            self._mapped.close()
+
+
+class StdoutCollector:
+    """
+    Вывод программы: хранится не больше limit байт, а при сравнении с файлом - только начало для отчета.
+    При сравнении с файлом лимит не меньше двойного размера ожидаемого вывода: верный вывод может отличаться
+    от файла пробельными символами (например, CRLF вместо LF), а лишний вывод сравнение все равно остановит.
+    """
+
+    def __init__(self, limit: int, expected_path: str | None):
+        self.size = 0
+        self.buffer = bytearray()
+        self.limit_exceeded = False
+        self.comparator = TokenComparator(expected_path) if expected_path else None
+        self.limit = max(limit, 2 * self.comparator.expected_size) if self.comparator else limit
+        self._keep = OUTPUT_PREVIEW if self.comparator else limit
+
+    def feed(self, chunk: bytes) -> bool:
+        """
+        Возвращает False, если дальше читать вывод не нужно: превышен лимит или найдено несовпадение.
+        """
+        self.size += len(chunk)
+        _append(self.buffer, chunk, self._keep)
+        if self.size > self.limit:
+            self.limit_exceeded = True
+            return False
+        if self.comparator is not None:
+            return self.comparator.feed(chunk)
+        return True
+
+
+def _append(buffer: bytearray, chunk: bytes, limit: int) -> bool:
+    """
+    Добавляет вывод в буфер не больше limit байт. Возвращает False, если лимит превышен.
+    """
+    free = limit - len(buffer)
+    buffer += chunk[:free]
+    return len(chunk) <= free
+
+
+def _drain(readers: list[int], stdout_r: int, stdout: StdoutCollector, stderr: bytearray) -> None:
+    for fd in readers:
+        try:
+            while chunk := os.read(fd, READ_CHUNK):
+                if fd != stdout_r:
+                    _append(stderr, chunk, STDERR_LIMIT)
+                elif not stdout.feed(chunk):
+                    break
+        except BlockingIOError:
+            pass
+
+
+def run_job(code, job: dict, protocol_fds: tuple[int, int]) -> dict:
+    stdin_r, stdin_w = os.pipe()
+    stdout_r, stdout_w = os.pipe()
+    stderr_r, stderr_w = os.pipe()
+
+    start_time = time.perf_counter()
+    pid = os.fork()
+    if pid == 0:
+        for fd in (stdin_w, stdout_r, stderr_r):
+            os.close(fd)
+        _run_child(code, job, protocol_fds, stdin_r, stdout_w, stderr_w)
+
+    for fd in (stdin_r, stdout_w, stderr_w):
+        os.close(fd)
+
+    # Файлы теста открываются только после fork(), чтобы код студента не получил их дескрипторы
+    input_mapped = None
+    if job.get("input_path"):
+        input_mapped, pending_input = _map_file(job["input_path"])
+    else:
+        pending_input = memoryview((job["input"] + "\n").encode())
+    for fd in (stdin_w, stdout_r, stderr_r):
+        os.set_blocking(fd, False)
+
+    # Вывод накапливается не больше лимита: бесконечный print не должен съесть память сервера
+    stdout = StdoutCollector(job["output_limit"], job.get("expected_path"))
+    stderr = bytearray()
+    readers = [stdout_r, stderr_r]
+    deadline = start_time + job["wall_time"]
+    timed_out = False
+    output_limit_exceeded = False
+
+    rusage = None
+    wait_status = None
+    stop_reading = False
+    while readers:
+        remaining = deadline - time.perf_counter()
+        if remaining <= 0:
+            timed_out = True
+            break
+        writers = [stdin_w] if stdin_w >= 0 else []
+        readable, writable, _ = select.select(readers, writers, [], min(remaining, 0.05))
+        for fd in writable:
+            try:
+                written = os.write(fd, pending_input[:READ_CHUNK])
+                pending_input = pending_input[written:]
+            except BlockingIOError:
+                continue
+            except BrokenPipeError:
+                pending_input = memoryview(b"")
+            if not pending_input:
+                os.close(stdin_w)
+                stdin_w = -1
+        for fd in readable:
+            chunk = os.read(fd, READ_CHUNK)
+            if not chunk:
+                readers.remove(fd)
+                os.close(fd)
+            elif fd == stderr_r:
+                _append(stderr, chunk, STDERR_LIMIT)
+            elif not stdout.feed(chunk):
+                stop_reading = True
+        # Превышен лимит вывода или вывод уже не совпал с ожидаемым - ждать завершения программы не нужно
+        if stop_reading:
+            output_limit_exceeded = stdout.limit_exceeded
+            break
+        # Порожденные студентом процессы могут держать stdout открытым после завершения программы
+        if not readable:
+            finished, status, usage = os.wait4(pid, os.WNOHANG)
+            if finished:
+                wait_status, rusage = status, usage
+                _drain(readers, stdout_r, stdout, stderr)
+                output_limit_exceeded = stdout.limit_exceeded
+                break
+
+    # Процесс мог закрыть stdout и продолжить работу, поэтому ожидание завершения тоже ограничено
+    while not (timed_out or stop_reading) and wait_status is None:
+        finished, status, usage = os.wait4(pid, os.WNOHANG)
+        if finished:
+            wait_status, rusage = status, usage
+        elif time.perf_counter() >= deadline:
+            timed_out = True
+        else:
+            time.sleep(0.001)
+
+    # Убивается вся группа процессов, включая процессы, которые мог оставить после себя код студента
+    try:
+        os.killpg(pid, signal.SIGKILL)
+    except ProcessLookupError:
+        pass
+    if wait_status is None:
+        os.kill(pid, signal.SIGKILL)
+        _, wait_status, rusage = os.wait4(pid, 0)
+    execution_time = round(time.perf_counter() - start_time, 3)
+
+    for fd in readers + ([stdin_w] if stdin_w >= 0 else []):
+        os.close(fd)
+    pending_input.release()
+    if input_mapped is not None:
+        input_mapped.close()
+
+    result = {
+        "output": stdout.buffer.decode(errors="replace"),
+        "execution_time": execution_time,
+        "cpu_time": round(rusage.ru_utime + rusage.ru_stime, 3),
+        "peak_memory_kb": rusage.ru_maxrss,  # В Linux ru_maxrss в килобайтах
+        "timed_out": timed_out,
+        "output_limit_exceeded": output_limit_exceeded,
+        "error": None,
+        "passed": None,
+        "mismatch": None,
+    }
+    comparator = stdout.comparator
+    if comparator is not None:
+        # Программа, остановленная на несовпадении, считается отработавшей: её завершил сам сервер
+        if comparator.mismatch is None and not (timed_out or output_limit_exceeded):
+            comparator.finish()
+        result["passed"] = comparator.mismatch is None and not (timed_out or output_limit_exceeded)
+        result["mismatch"] = comparator.mismatch
+        comparator.close()
+        if comparator.mismatch is not None and stop_reading:
+            return result
+    if output_limit_exceeded:
+        return result
+    # SIGXCPU - превышен лимит процессорного времени
+    if os.WIFSIGNALED(wait_status) and os.WTERMSIG(wait_status) in (signal.SIGXCPU, signal.SIGKILL):
+        result["timed_out"] = True
+        result["passed"] = False if comparator is not None else None
+    elif os.waitstatus_to_exitcode(wait_status) != 0:
+        result["error"] = _error_message(bytes(stderr))
+        result["passed"] = False if comparator is not None else None
+    return result
+
+
+def main() -> None:
+    # Канал связи с пулом переносится на отдельные дескрипторы, а 0 и 1 освобождаются
+    requests_fd = os.dup(0)
+    responses_fd = os.dup(1)
+    devnull = os.open(os.devnull, os.O_RDWR)
+    os.dup2(devnull, 0)
+    os.dup2(devnull, 1)
+    os.close(devnull)
+
+    # Скомпилированный код последнего решения: тесты одного решения идут подряд,
+    # поэтому код передается и загружается только при смене решения
+    code_key, code = None, None
+    while True:
+        job = read_message(requests_fd)
+        if job is None:
+            break
+        if job["code_key"] != code_key:
+            code_key, code = job["code_key"], marshal.loads(job["code"])
+        write_message(responses_fd, run_job(code, job, (requests_fd, responses_fd)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+Поиск похожих решений: MinHash-сигнатуры по шинглам нормализованных токенов и LSH-корзины.
+
+Код разбивается на токены, имена переменных, числа и строки заменяются обобщенными токенами,
+комментарии и пустые строки отбрасываются, поэтому переименование переменных и правка комментариев
+не меняют сигнатуру. Сигнатура делится на BANDS полос по ROWS значений, хэш каждой полосы - номер корзины.
+Решения, совпавшие хотя бы в одной корзине, - кандидаты, для них сходство оценивается по доле
+совпадающих значений сигнатуры. Решения с оценкой сходства s попадают в одну корзину с вероятностью
+1 - (1 - s^ROWS)^BANDS: около 0.5 при s = 0.5 и больше 0.99 при s = 0.8.
+"""
+import hashlib
+import keyword
+import random
+import re
+import struct
+
+SHINGLE_SIZE = 5  # Токенов в одном шингле
+BANDS = 16
+ROWS = 4
+NUM_PERM = BANDS * ROWS
+
+_PRIME = (1 << 61) - 1
+_rng = random.Random(20240101)  # Фиксированное зерно: сигнатуры должны совпадать между перезапусками
+_PERMUTATIONS = [(_rng.randrange(1, _PRIME), _rng.randrange(0, _PRIME)) for _ in range(NUM_PERM)]
+
+_TOKEN = re.compile(r"""
+    (?P<comment>\#[^\n]*)
+  | (?P<string>[rbfuRBFU]{0,2}(?:\"\"\"[\s\S]*?\"\"\"|'''[\s\S]*?'''|"(?:\\.|[^"\\\n])*"|'(?:\\.|[^'\\\n])*'))
+  | (?P<name>[A-Za-z_]\w*)
+  | (?P<number>\d[\w.]*)
+  | (?P<newline>\n)
+  | (?P<op>\*\*=?|//=?|->|[-+*/%<>=!&|^@]=|\S)
+""", re.VERBOSE)
+
+
+def normalize_tokens(code: str) -> list[str]:
+    """
+    Нормализованные токены кода: имена - ID, числа - NUM, строки - STR, конец строки - ";".
+    Комментарии и пустые строки отбрасываются. Код не обязан быть синтаксически верным.
+    """
+    tokens = []
+    for match in _TOKEN.finditer(code):
+        kind = match.lastgroup
+        if kind == "comment":
+            continue
+        if kind == "name":
+            value = match.group()
+            tokens.append(value if keyword.iskeyword(value) else "ID")
+        elif kind == "number":
+            tokens.append("NUM")
+        elif kind == "string":
+            tokens.append("STR")
+        elif kind == "newline":
+            if tokens and tokens[-1] != ";":
+                tokens.append(";")
+        else:
+            tokens.append(match.group())
+    return tokens
+
+
+def _hash64(data: bytes) -> int:
+    return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), "little")
+
+
+def shingles(code: str) -> set[int]:
+    tokens = normalize_tokens(code)
+    if len(tokens) < SHINGLE_SIZE:
+        return {_hash64(" ".join(tokens).encode())}
+    # Повторяющиеся шинглы хэшируются один раз
+    grams = {" ".join(tokens[i:i + SHINGLE_SIZE]) for i in range(len(tokens) - SHINGLE_SIZE + 1)}
+    return {_hash64(gram.encode()) for gram in grams}
+
+
+def signature(code: str) -> list[int]:
+    """
+    MinHash-сигнатура кода: минимум каждой из NUM_PERM хэш-функций по шинглам.
+    """
+    values = shingles(code)
+    return [
+        min((a * value + b) % _PRIME for value in values)
+        for a, b in _PERMUTATIONS
+    ]
+
+
+def bands(sig: list[int]) -> list[int]:
+    """
+    Номера LSH-корзин по полосам сигнатуры, знаковые 64-битные числа для колонки BIGINT.
+    """
+    return [
+        _hash64(struct.pack(f"<{ROWS}Q", *sig[band * ROWS:(band + 1) * ROWS])) - (1 << 63)
+        for band in range(BANDS)
+    ]
+
+
+def pack(sig: list[int]) -> bytes:
+    return struct.pack(f"<{NUM_PERM}Q", *sig)
+
+
+def unpack(data: bytes) -> list[int]:
+    return list(struct.unpack(f"<{NUM_PERM}Q", data))
+
+
+def similarity(first: list[int], second: list[int]) -> float:
+    """
+    Оценка коэффициента Жаккара множеств шинглов по сигнатурам.
+    """
+    return sum(1 for a, b in zip(first, second) if a == b) / NUM_PERM
@@ -1,154 +1,65 @@
-import contextlib
-import io
-import threading
-import time
-import re
-from typing import List, Dict
-
-from app.db.task_methods import get_test_cases_by_task, update_solution_status
-from  app.schemas.tests import TestCase
-
-
-class TeacherList:
-    variables = dict()
-    input_variables = []
-    formulas_teacher = dict()
-    formulas_student = dict()
-    check = []
-    operations_in_math = ['+', '-', '/', '*', '=']
-
-    def __int__(self, variables, formulas):
-        self.variables = variables
-        self.formulas = formulas
-
-    def binding_variables(self, a, b):  # a - student variable, b - teacher variable
-        buff = dict()
-        for i in range(0, len(self.variables)):
-            if b == list(self.variables.items())[i][1]:
-                buff[a] = b
-            else:
-                buff[list(self.variables.items())[i][0]] = list(self.variables.items())[i][1]
-        self.variables = buff
-
-    def binding_formulas(self, a, b):  # a - student formula, b - teacher formula
-        for i in range(0, len(self.formulas_teacher)):
-            if b == list(self.formulas_teacher.items())[i][1]:
-                self.formulas_student[i] = a
-
-    def add_variable(self, a):
-        flag = False
-        for i in range(0, len(self.variables)):
-            if a == self.variables[i]:
-                flag = True
-        if not flag:
-            self.variables[len(self.variables)] = a
-
-    def add_teacher_formula(self, a):
-        buff = []
-        for char1 in a:
-            for char2 in self.operations_in_math:
-                if char1 == char2:
-                    buff.append(a[:a.find(char2)])
-                    self.add_variable(a[:a.find(char2)])
-                    buff.append(char2)
-                    a = a[a.find(char2) + 1:]
-        buff.append(a)
-        self.add_variable(a)
-        self.formulas_teacher[len(self.formulas_teacher)] = buff
-        self.check.append(False)
-
-    def normalize_formula(self, formula: str) -> str:
-        var_regex = re.compile(r'[a-zA-Z_][a-zA-Z0-9_]*')
-        normalized = formula
-        var_map: Dict[str, str] = {}
-        var_count = 0
-
-        for match in var_regex.finditer(formula):
-            match_str = match.group()
-            if match_str not in var_map:
-                var_map[match_str] = f"VAR{var_count}"
-                var_count += 1
-
-        for original, replacement in var_map.items():
-            normalized = re.sub(r'\b' + original + r'\b', replacement, normalized)
-
-        normalized = normalized.replace(' ', '')
-        if normalized.endswith(';'):
-            normalized = normalized[:-1]
-
-        return normalized
-
-    def extract_expressions(self, line: str) -> List[str]:
-        expr_regex = re.compile(r'([\w\s\+\-\*/\^\=()]+)')
-        expressions = []
-
-        for match in expr_regex.finditer(line):
-            expr = match.group(1).strip()
-            if any(op in expr for op in '+-*/=^'):
-                expressions.append(expr)
-
-        return expressions
-
-    def add_student_formula(self, line):
-        normalized_input = self.normalize_formula("".join(self.formulas_teacher[0]))
-        found = False
-
-        line = line.rstrip('\n')
-        if line.endswith(';'):
-            line = line[:-1]
-
-        for i in self.formulas_teacher:
-            expressions = self.extract_expressions(line)
-            for expr in expressions:
-                normalized_line = self.normalize_formula(expr)
-                if normalized_input == normalized_line:
-                    found = True
-                    break
-
-                if found:
-                    break
-
-            if found:
-                self.binding_variables(line, self.formulas_teacher[i])
-                self.binding_formulas(line, self.formulas_teacher[i])
-
-async def check_formulas(teacher_formula_str, input_variables_str, code_str) -> tuple[str, bool]:
-    teacher_list = TeacherList()
-    for line in teacher_formula_str.splitlines():
-        line = line.rstrip()
-        teacher_list.add_teacher_formula(line)
-
-    for line in input_variables_str.splitlines():
-        line = line.rstrip()
-        teacher_list.input_variables.append(line)
-
-    input_count = 0
-    for line in code_str.splitlines():
-        line = line.rstrip()
-        if 'input()' in line:
-            char = line[:line.find('=')].strip()
-            teacher_list.binding_variables(char, teacher_list.input_variables[input_count])
-            input_count += 1
-        else:
-            teacher_list.add_student_formula(line)
-
-    res = ""
-    all_formulas_correct = True
-    for i in range(len(teacher_list.formulas_teacher)):
-        if i in teacher_list.formulas_student:
-            student_formula = "".join(teacher_list.formulas_student[i])
-            teacher_formula = "".join(teacher_list.formulas_teacher[i])
-            if student_formula != teacher_formula:
-                all_formulas_correct = False
-            res += student_formula + '\n'
-        else:
-            all_formulas_correct = False
-
-    return res, all_formulas_correct
-
-
-async def run_tests(task_id: int, code_str: str) -> dict:
-    test_cases = get_test_cases_by_task(task_id)
+import asyncio
+import os
+from typing import Awaitable, Callable
+
+from app.core.timing import stage
+from app.db.task_methods import update_solution_status
+from app.testing_pyfiles.cache import result_cache
+from app.testing_pyfiles.executor import CompiledCode, execute_async, prepare_async
+from app.testing_pyfiles.formulas import check_formulas
+from app.testing_pyfiles.plan import GradingPlan, PlanTestCase
+from  app.schemas.tests import ExecutionLimits, ExecutionResult, TestCase, TestCaseEvent, TestCaseReport
+
+EventCallback = Callable[[TestCaseEvent], Awaitable[None]]
+
+
+def _execution_output(execution: ExecutionResult) -> str:
+    """
+    Вывод программы с пометкой о превышении лимита или ошибке выполнения.
+    """
+    result = execution.output
+    if execution.timed_out:
+        result += "Execution timed out."
+    elif execution.output_limit_exceeded:
+        result += "Output limit exceeded."
+    elif execution.error:
+        result += f"Error executing code: {execution.error}"
+    return result
+
+
+def _input_description(test_case: PlanTestCase) -> str:
+    if test_case.inp_path:
+        return f"file {os.path.basename(test_case.inp_path)}"
+    return test_case.inp
+
+
+def _verdict(test_case: PlanTestCase, execution: ExecutionResult) -> tuple[bool, str, str]:
+    """
+    Результат теста для отчета: пройден ли тест, вывод программы и ожидаемый вывод.
+    Для теста с файлом ожидаемого вывода сравнение уже выполнено в песочнице, в отчет попадает первое несовпадение.
+    """
+    user_output = _execution_output(execution).strip()
+    if not test_case.out_path:
+        return user_output == test_case.out, user_output, test_case.out
+
+    expected_output = f"file {os.path.basename(test_case.out_path)}"
+    mismatch = execution.mismatch
+    if mismatch:
+        position = f"token {mismatch.token}, line {mismatch.line}"
+        expected_output += f" ({position}): {mismatch.expected}"
+        user_output = f"({position}): {mismatch.actual}\n{user_output}"
+    return bool(execution.passed), user_output, expected_output
+
+
+async def run_tests(test_cases: list[PlanTestCase], code_str: str, limits: ExecutionLimits,
+                    on_event: EventCallback | None = None) -> dict:
+    """
+    Запускает тесты по порядку до первого непройденного.
+
+    :param limits: Лимиты на один тест
+
+    :param on_event: Необязательный обработчик событий по каждому тесту (started, passed, failed)
+    """
     if not test_cases:
         return {
             "test_case_number": -1,
@@ -158,72 +69,135 @@ async def run_tests(task_id: int, code_str: str) -> dict:
             "status": "Failed"
         }
 
-    total_execution_time = 0
-    code_length = sum(1 for line in code_str.split('\n') if line.strip())
+    total_cpu_time = 0
+    peak_memory_kb = 0
 
-    for index, test_case in enumerate(test_cases):
-        input_data = test_case.inp
-        expected_output = test_case.out
+    # Код компилируется один раз на все тесты
+    try:
+        code = await prepare_async(CompiledCode, code_str)
+    except (SyntaxError, ValueError) as e:
+        if on_event:
+            await on_event(TestCaseEvent(event="failed", test_case_number=1, duration=0.0))
+        return {
+            "test_case_number": 1,
+            "input_data": _input_description(test_cases[0]),
+            "user_output": f"Error executing code: {e}",
+            "expected_output": test_cases[0].out,
+            "status": "Failed"
+        }
 
-        # Подготовка кода с входными данными
-        code_with_input = f"import sys\ninput = lambda: '{input_data}'\n{code_str}"
+    for index, test_case in enumerate(test_cases):
+        if on_event:
+            await on_event(TestCaseEvent(event="started", test_case_number=index + 1))
 
         # Выполнение кода
-        output = io.StringIO()
-        start_time = time.time()
-        execute_status = True
-
-        def exec_code():
-            try:
-                with contextlib.redirect_stdout(output):
-                    exec(code_with_input)
-            except Exception as e:
-                nonlocal execute_status
-                execute_status = False
-                output.write(f"Error executing code: {e}")
-
-        thread = threading.Thread(target=exec_code)
-        thread.start()
-        thread.join(timeout=5)
-
-        if thread.is_alive():
-            output.write("Execution timed out.")
-            thread.join()
-
-        end_time = time.time()
-        execution_time = round(end_time - start_time, 3)
-        total_execution_time += execution_time
-        result = output.getvalue()
+        execution = await execute_async(code, test_case.inp, limits, test_case.inp_path, test_case.out_path)
+        total_cpu_time += execution.cpu_time
+        peak_memory_kb = max(peak_memory_kb, execution.peak_memory_kb)
 
         # Сравнение результата с ожидаемым выводом
-        if result.strip() != expected_output.strip():
+        passed, user_output, expected_output = _verdict(test_case, execution)
+        if on_event:
+            await on_event(TestCaseEvent(
+                event="passed" if passed else "failed",
+                test_case_number=index + 1,
+                duration=execution.execution_time,
+                cpu_time=execution.cpu_time,
+                peak_memory_kb=execution.peak_memory_kb
+            ))
+        if not passed:
             return {
                 "test_case_number": index + 1,
-                "input_data": input_data,
-                "user_output": result.strip(),
-                "expected_output": expected_output.strip(),
-                "status": "Failed"
+                "input_data": _input_description(test_case),
+                "user_output": user_output,
+                "expected_output": expected_output,
+                "status": "Failed",
+                "timed_out": execution.timed_out,
+                "peak_memory_kb": peak_memory_kb
             }
 
     return {
-        "total_execution_time": round(total_execution_time, 3),
-        "code_length": code_length,
+        "total_execution_time": round(total_cpu_time, 3),
+        "peak_memory_kb": peak_memory_kb,
         "execution_status": "Success",
         "status": "Success"
     }
 
 
-# main testing function
-async def check_file(task_id: int, teacher_formula: str, input_variables: str, student_code: str,
-                     solution_id: int) -> TestCase:
+async def run_all_tests(test_cases: list[PlanTestCase], code_str: str,
+                        limits: ExecutionLimits) -> list[TestCaseReport]:
+    """
+    Запускает все тесты параллельно на процессах пула, не останавливаясь на первой ошибке.
+    Используется преподавателем для отладки лабораторной работы, студенты проверяются через run_tests.
+
+    :param test_cases: Тесты из плана проверки
+    :param code_str: Код решения
+    :param limits: Лимиты на один тест
+    :return: Отчет по каждому тесту в порядке их следования
+    """
+    try:
+        code = await prepare_async(CompiledCode, code_str)
+    except (SyntaxError, ValueError) as e:
+        return [
+            TestCaseReport(
+                test_case_number=index + 1,
+                input_data=_input_description(test_case),
+                expected_output=test_case.out,
+                user_output=f"Error executing code: {e}",
+                passed=False
+            )
+            for index, test_case in enumerate(test_cases)
+        ]
+
+    # Одновременно выполняется не больше тестов, чем процессов в пуле, остальные ждут в очереди executor
+    executions = await asyncio.gather(*(
+        execute_async(code, test_case.inp, limits, test_case.inp_path, test_case.out_path)
+        for test_case in test_cases
+    ))
+
+    reports = []
+    for index, (test_case, execution) in enumerate(zip(test_cases, executions)):
+        passed, user_output, expected_output = _verdict(test_case, execution)
+        reports.append(TestCaseReport(
+            test_case_number=index + 1,
+            input_data=_input_description(test_case),
+            expected_output=expected_output,
+            user_output=user_output,
+            passed=passed,
+            execution_time=execution.execution_time,
+            cpu_time=execution.cpu_time,
+            peak_memory_kb=execution.peak_memory_kb,
+            timed_out=execution.timed_out,
+            output_limit_exceeded=execution.output_limit_exceeded,
+            mismatch=execution.mismatch
+        ))
+    return reports
+
+
+async def grade_code(plan: GradingPlan, student_code: str,
+                     on_event: EventCallback | None = None) -> TestCase:
+    """
+    Проверяет код по плану задачи (формулы и тесты) без обновления статуса решения в БД.
+    """
     # Проверка формул
-    formulas_output, formulas_correct = await check_formulas(teacher_formula, input_variables, student_code)
-
-    # Выполнение тестов
-    test_result = await run_tests(task_id, student_code)
+    with stage("formulas"):
+        formulas_output, formulas_correct = await check_formulas(plan.formulas, student_code)
+
+    # Выполнение тестов. Результат берется из кэша, если такой же код уже проверялся на этом же наборе тестов
+    with stage("cache"):
+        # Ключ строится по AST решения, поэтому для больших решений вычисляется вне event loop
+        cache_key = await prepare_async(result_cache.make_key, student_code, plan.fingerprint)
+        test_result = result_cache.get(cache_key)
+    if test_result is not None and on_event:
+        await on_event(TestCaseEvent(event="cached"))
+    if test_result is None:
+        with stage("tests"):
+            test_result = await run_tests(plan.test_cases, student_code, plan.limits, on_event)
+        # Таймаут может быть вызван нагрузкой на сервер, поэтому такие результаты не кэшируются
+        if plan.test_cases and not test_result.get("timed_out"):
+            result_cache.put(cache_key, test_result)
 
     if test_result.get("status") == "Failed":
-        update_solution_status(solution_id, "Failed")
         return TestCase(
             formulas_output=formulas_output,
             code_output=f"Test case {test_result['test_case_number']} failed.\n"
@@ -232,14 +206,24 @@ async def check_file(task_id: int, teacher_formula: str, input_variables: str, s
                         f"User output: {test_result['user_output']}",
             execution_time=0.0,
             code_length=0,
-            execution_status=test_result["status"]
+            execution_status=test_result["status"],
+            peak_memory_kb=test_result.get("peak_memory_kb", 0)
         )
 
-    update_solution_status(solution_id, "Success")
     return TestCase(
         formulas_output=formulas_output,
         code_output="All tests passed successfully.",
         execution_time=test_result['total_execution_time'],
-        code_length=test_result['code_length'],
-        execution_status=test_result["status"]
+        code_length=sum(1 for line in student_code.split('\n') if line.strip()),
+        execution_status=test_result["status"],
+        peak_memory_kb=test_result["peak_memory_kb"]
     )
+
+
+# main testing function
+async def check_file(plan: GradingPlan, student_code: str, solution_id: int,
+                     on_event: EventCallback | None = None) -> TestCase:
+    result = await grade_code(plan, student_code, on_event)
+    with stage("db_update_status"):
+        await asyncio.to_thread(update_solution_status, solution_id, result.execution_status)
+    return result
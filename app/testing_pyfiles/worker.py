@@ -0,0 +1,123 @@
+"""
+Воркер проверки решений для очереди в PostgreSQL (grading.queue_backend = "postgres").
+
+Забирает задания из таблицы GradingJob (SELECT ... FOR UPDATE SKIP LOCKED), проверяет решение
+через check_file и записывает результат обратно. Воркеров можно запускать сколько угодно,
+на одной или нескольких машинах с доступом к общей БД.
+
+Запуск: python -m app.testing_pyfiles.worker [--concurrency N] [--name NAME]
+SIGINT/SIGTERM: новые задания не забираются, начатые проверки доводятся до конца.
+"""
+import argparse
+import asyncio
+import os
+import signal
+import socket
+
+from app.config.config import init_config
+from app.db.job_methods import claim_grading_job, delete_finished_grading_jobs, finish_grading_job, \
+    requeue_stale_grading_jobs, touch_grading_job
+from app.db.task_methods import get_grading_data
+from app.testing_pyfiles.executor import WORKERS, pool
+from app.testing_pyfiles.jobs import grade_solution
+from app.testing_pyfiles.plan import GradingPlan
+
+cfg = init_config()['grading']
+
+MAINTENANCE_INTERVAL = 60  # Период возврата зависших заданий и удаления старых, секунды
+HEARTBEAT_INTERVAL = cfg['job_stale_after'] / 3  # Период продления выполняемого задания, секунды
+
+
+async def heartbeat(job_id: str, name: str) -> None:
+    """
+    Продлевает задание, пока идет проверка, чтобы maintain() другого воркера не вернул его в очередь.
+    """
+    while True:
+        await asyncio.sleep(HEARTBEAT_INTERVAL)
+        try:
+            if not await asyncio.to_thread(touch_grading_job, job_id, name):
+                return
+        except Exception:
+            # БД временно недоступна: попытка повторится на следующем шаге
+            pass
+
+
+async def process(job: dict, name: str) -> None:
+    beat = asyncio.create_task(heartbeat(job['id'], name))
+    try:
+        # План строится заново для каждого задания: кэш планов сбрасывается только в процессе API,
+        # поэтому здесь он мог бы устареть после изменения тестов преподавателем
+        grading_data = await asyncio.to_thread(get_grading_data, job['task_id'])
+        if grading_data is None:
+            raise ValueError("Task not found.")
+        result = await grade_solution(GradingPlan(*grading_data), job['code'], job['solution_id'])
+        finished = await asyncio.to_thread(finish_grading_job, job['id'], name, result.model_dump_json())
+    except Exception as e:
+        finished = await asyncio.to_thread(finish_grading_job, job['id'], name, None, str(e))
+    finally:
+        beat.cancel()
+    if not finished:
+        print(f"Grading job {job['id']} is no longer owned by {name}, result discarded")
+
+
+async def pause(stop: asyncio.Event, seconds: float) -> None:
+    """
+    Ждет seconds секунд или до остановки воркера.
+    """
+    try:
+        await asyncio.wait_for(stop.wait(), seconds)
+    except asyncio.TimeoutError:
+        pass
+
+
+async def consume(name: str, stop: asyncio.Event) -> None:
+    while not stop.is_set():
+        try:
+            job = await asyncio.to_thread(claim_grading_job, name)
+            if job is not None:
+                await process(job, name)
+                continue
+        except Exception as e:
+            # БД временно недоступна (перезапуск, разрыв соединения): воркер продолжает работу
+            print(f"Grading worker {name}: error processing jobs: {e}")
+        await pause(stop, cfg['worker_poll_interval'])
+
+
+async def maintain(stop: asyncio.Event) -> None:
+    while not stop.is_set():
+        try:
+            await asyncio.to_thread(requeue_stale_grading_jobs, cfg['job_stale_after'], cfg['job_max_attempts'])
+            await asyncio.to_thread(delete_finished_grading_jobs, cfg['job_ttl'])
+        except Exception as e:
+            print(f"Grading worker maintenance error: {e}")
+            await pause(stop, cfg['worker_poll_interval'])
+            continue
+        await pause(stop, MAINTENANCE_INTERVAL)
+
+
+async def run(name: str, concurrency: int) -> None:
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+
+    print(f"Grading worker {name} started, concurrency {concurrency}")
+    await asyncio.gather(maintain(stop), *(consume(name, stop) for _ in range(concurrency)))
+    print(f"Grading worker {name} stopped")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=cfg['worker_concurrency'] or WORKERS,
+                        help="Одновременно проверяемых решений")
+    parser.add_argument("--name", default=f"{socket.gethostname()}:{os.getpid()}", help="Имя воркера")
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(run(args.name, args.concurrency))
+    finally:
+        pool.close()
+
+
+if __name__ == "__main__":
+    main()
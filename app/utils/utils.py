@@ -3,10 +3,11 @@ from http import HTTPStatus
 from starlette.responses import JSONResponse
 
 
-def response_with_error(code: HTTPStatus, msg: str) -> JSONResponse:
+def response_with_error(code: HTTPStatus, msg: str, headers: dict[str, str] | None = None) -> JSONResponse:
     return JSONResponse(
         status_code=code,
-        content={"Error": msg}
+        content={"Error": msg},
+        headers=headers
     )
 
 def response_with_json(code: HTTPStatus, data: any) -> JSONResponse: